@@ -0,0 +1,37 @@
+"""add_message_conversation_created_index
+
+Revision ID: 2d7a9e4c1f86
+Revises: 9c3e1f2a7b4d
+Create Date: 2026-10-17 10:31:07.542916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7a9e4c1f86'
+down_revision: Union[str, None] = '9c3e1f2a7b4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name == 'postgresql':
+        # Build without locking the messages table; CONCURRENTLY cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_messages_conversation_created',
+                'messages',
+                ['conversation_id', 'created_at'],
+                unique=False,
+                postgresql_concurrently=True
+            )
+    else:
+        op.create_index('ix_messages_conversation_created', 'messages', ['conversation_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_conversation_created', table_name='messages')
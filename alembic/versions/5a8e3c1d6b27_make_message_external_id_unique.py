@@ -0,0 +1,46 @@
+"""make_message_external_id_unique
+
+Revision ID: 5a8e3c1d6b27
+Revises: 7f4b2c8d9e15
+Create Date: 2026-10-17 14:12:48.306215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a8e3c1d6b27'
+down_revision: Union[str, None] = '7f4b2c8d9e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the earliest copy of each external message; later copies are duplicate deliveries
+    op.execute(
+        "DELETE FROM messages WHERE external_id IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM messages WHERE external_id IS NOT NULL GROUP BY external_id)"
+    )
+    
+    if op.get_context().dialect.name == 'postgresql':
+        # Rebuild without locking the messages table; CONCURRENTLY cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_messages_external_id', table_name='messages', postgresql_concurrently=True)
+            op.create_index(
+                'ix_messages_external_id',
+                'messages',
+                ['external_id'],
+                unique=True,
+                postgresql_concurrently=True
+            )
+    else:
+        op.drop_index('ix_messages_external_id', table_name='messages')
+        op.create_index('ix_messages_external_id', 'messages', ['external_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_external_id', table_name='messages')
+    op.create_index('ix_messages_external_id', 'messages', ['external_id'], unique=False)
@@ -0,0 +1,35 @@
+"""use_jsonb_for_json_columns_on_postgresql
+
+Revision ID: 7f4b2c8d9e15
+Revises: 2d7a9e4c1f86
+Create Date: 2026-10-17 11:02:55.184330
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f4b2c8d9e15'
+down_revision: Union[str, None] = '2d7a9e4c1f86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Only PostgreSQL distinguishes json from jsonb; other backends keep the generic JSON type
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    
+    op.execute("ALTER TABLE conversations ALTER COLUMN context TYPE jsonb USING context::jsonb")
+    op.execute("ALTER TABLE messages ALTER COLUMN message_metadata TYPE jsonb USING message_metadata::jsonb")
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    
+    op.execute("ALTER TABLE messages ALTER COLUMN message_metadata TYPE json USING message_metadata::json")
+    op.execute("ALTER TABLE conversations ALTER COLUMN context TYPE json USING context::json")
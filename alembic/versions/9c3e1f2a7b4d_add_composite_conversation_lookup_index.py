@@ -0,0 +1,38 @@
+"""add_composite_conversation_lookup_index
+
+Revision ID: 9c3e1f2a7b4d
+Revises: 5ef2076cd9b2
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3e1f2a7b4d'
+down_revision: Union[str, None] = '5ef2076cd9b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Replace the single-column channel/thread indexes with one composite index
+    # whose leftmost prefix (user_id) matches every conversation lookup
+    op.create_index(
+        'ix_conversations_user_channel_thread',
+        'conversations',
+        ['user_id', 'channel_id', 'thread_id'],
+        unique=False,
+        postgresql_using='btree'
+    )
+    op.drop_index(op.f('ix_conversations_thread_id'), table_name='conversations')
+    op.drop_index(op.f('ix_conversations_channel_id'), table_name='conversations')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_conversations_channel_id'), 'conversations', ['channel_id'], unique=False)
+    op.create_index(op.f('ix_conversations_thread_id'), 'conversations', ['thread_id'], unique=False)
+    op.drop_index('ix_conversations_user_channel_thread', table_name='conversations')
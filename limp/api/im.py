@@ -2,8 +2,12 @@
 Common instant messaging functionality.
 """
 
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
+import asyncio
+import inspect
 import logging
 from datetime import datetime, timedelta
 
@@ -14,10 +18,16 @@ from ..services.tools import ToolsService
 from ..services.context import ContextManager
 from ..config import get_config
 from ..models.user import User
-from ..models.conversation import Conversation, Message
+from ..models.conversation import Conversation, Message, MESSAGE_HISTORY_COLUMNS
 
 logger = logging.getLogger(__name__)
 
+# Dialect-specific INSERT constructs supporting ON CONFLICT DO NOTHING
+_CONFLICT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
 
 def generate_slack_message_id(message_data: Dict[str, Any]) -> str:
     """Generate unique identifier for Slack message to prevent duplicates."""
@@ -32,10 +42,10 @@ def generate_slack_message_id(message_data: Dict[str, Any]) -> str:
 
 def is_duplicate_message(db: Session, external_id: str) -> bool:
     """Check if a message with the given external_id already exists."""
-    existing_message = db.query(Message).filter(
+    existing_message_id = db.query(Message.id).filter(
         Message.external_id == external_id
     ).first()
-    return existing_message is not None
+    return existing_message_id is not None
 
 
 async def handle_user_message(
@@ -84,12 +94,13 @@ async def handle_user_message(
                     request
                 )
         
-        # Acknowledge the user's message
-        im_service.acknowledge_message(message_data["channel"], message_data.get("timestamp"))
-        
         # Get or create conversation and store user message
         conversation = get_or_create_conversation(db, user.id, message_data, platform)
-        store_user_message(db, conversation.id, message_data["text"], message_data.get("timestamp"), external_id)
+        if store_user_message(db, conversation.id, message_data["text"], message_data.get("timestamp"), external_id) is None:
+            return {"status": "ok", "action": "duplicate_ignored"}
+        
+        # Acknowledge the user's message only once it is stored, so a duplicate never gets a reaction to clean up
+        im_service.acknowledge_message(message_data["channel"], message_data.get("timestamp"))
         
         # Get conversation history with context management and temporary messages
         conversation_history = get_conversation_history(
@@ -235,8 +246,8 @@ async def process_llm_workflow(
         
         # Iterative tool calling loop
         while iteration < max_iterations:
-            # Send to LLM
-            response = llm_service.chat_completion(messages, tools, stream=True)
+            # Send to LLM; the blocking round trip runs in a worker thread so the event loop keeps serving webhooks
+            response = await asyncio.to_thread(llm_service.chat_completion, messages, tools, stream=True)
             
             # Check for tool calls
             if llm_service.is_tool_call_response(response):
@@ -448,10 +459,9 @@ async def process_llm_workflow(
                     system_name = tools_service.get_system_name_for_tool(tool_call["function"]["name"], system_configs)
                     system_config = get_system_config(system_name, system_configs)
                     
-                    # Load OpenAPI spec and generate tool-specific system prompt
+                    # Tool-specific system prompts, generated once per spec for this message
                     try:
-                        openapi_spec = tools_service._get_or_load_spec(system_config["openapi_spec"])
-                        tool_prompts = tools_service.generate_tool_system_prompts(openapi_spec)
+                        tool_prompts = tools_service.get_tool_system_prompts(system_config["openapi_spec"])
                         tool_name = tool_call["function"]["name"]
                         if tool_name in tool_prompts:
                             tool_system_prompts[tool_name] = tool_prompts[tool_name]
@@ -486,7 +496,7 @@ async def process_llm_workflow(
         messages.append({"role": "user", "content": final_prompt})
         
         # Get final response without tools
-        final_response = llm_service.chat_completion(messages)
+        final_response = await asyncio.to_thread(llm_service.chat_completion, messages)
         return {
             "content": final_response["content"],
             "finish_reason": final_response.get("finish_reason")
@@ -663,19 +673,35 @@ def get_or_create_conversation(db: Session, user_id: int, message_data: Dict[str
         return conversation
 
 
-def store_user_message(db: Session, conversation_id: int, content: str, timestamp: Optional[str] = None, external_id: Optional[str] = None) -> Message:
-    """Store user message in database."""
-    message = Message(
-        conversation_id=conversation_id,
-        role="user",
-        content=content,
-        external_id=external_id,
-        message_metadata={"timestamp": timestamp} if timestamp else None
-    )
-    db.add(message)
+def store_user_message(db: Session, conversation_id: int, content: str, timestamp: Optional[str] = None, external_id: Optional[str] = None) -> Optional[Message]:
+    """Store user message in database. Returns None if a message with the same external_id already exists."""
+    values = {
+        "conversation_id": conversation_id,
+        "role": "user",
+        "content": content,
+        "external_id": external_id,
+        "message_metadata": {"timestamp": timestamp} if timestamp else None,
+    }
+    
+    insert = _CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+    if external_id is None or insert is None:
+        message = Message(**values)
+        db.add(message)
+        db.commit()
+        db.refresh(message)
+        return message
+    
+    # Dedup in the same round-trip as the insert; a concurrent duplicate delivery loses here
+    stmt = insert(Message).values(**values).on_conflict_do_nothing(
+        index_elements=["external_id"]
+    ).returning(Message.id)
+    message_id = db.execute(stmt).scalar()
     db.commit()
-    db.refresh(message)
-    return message
+    
+    if message_id is None:
+        logger.info(f"Duplicate message detected on insert, ignoring: {external_id}")
+        return None
+    return db.get(Message, message_id)
 
 
 def store_assistant_message(db: Session, conversation_id: int, content: str, metadata: Optional[Dict[str, Any]] = None) -> Message:
@@ -829,7 +855,7 @@ def get_conversation_history(db: Session, conversation_id: int, im_service=None,
     context_manager = ContextManager(config.llm)
     
     # Get raw messages for break detection
-    raw_messages = db.query(Message).filter(
+    raw_messages = db.query(*MESSAGE_HISTORY_COLUMNS).filter(
         Message.conversation_id == conversation_id
     ).order_by(Message.created_at.asc()).all()
     
@@ -839,11 +865,9 @@ def get_conversation_history(db: Session, conversation_id: int, im_service=None,
         logger.info(f"Trimming conversation history at index {break_index}")
         # Trim raw messages before formatting
         raw_messages = raw_messages[break_index:]
-        # Use context manager to reconstruct history with summaries (now with trimmed messages)
-        history = context_manager.reconstruct_history_with_summary_from_messages(raw_messages)
-    else:
-        # No break detected, use the original method for backward compatibility
-        history = context_manager.reconstruct_history_with_summary(db, conversation_id)
+    
+    # Reconstruct history with summaries from the rows already loaded, instead of querying them again
+    history = context_manager.reconstruct_history_with_summary_from_messages(raw_messages)
     
     # Check if we need to summarize the conversation
     if context_manager.should_summarize(history):
@@ -902,11 +926,14 @@ async def handle_authorization_request(
     
     # Send DM to user's private channel (not the original channel)
     user_dm_channel = im_service.get_user_dm_channel(user_id)
-    await im_service.send_message(
+    # Teams sends asynchronously, Slack returns its result directly
+    sent = im_service.send_message(
         user_dm_channel,
         authorization_prompt,
         button_metadata
     )
+    if inspect.isawaitable(sent):
+        await sent
     
     # Complete the message with failure status (authorization required)
     im_service.complete_message(
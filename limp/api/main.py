@@ -9,9 +9,13 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 import logging
+import threading
 
-from ..database import get_session, init_database, create_engine
+from ..database import get_session, init_database, create_engine, close_engine
 from ..config import Config, set_config
+from ..services.context import warm_encoding
+from ..services.llm import close_http_clients
+from ..services.slack import close_http_session
 from .slack import slack_router, SLACK_BOT_PERMISSIONS
 from .teams import teams_router
 from .oauth2 import oauth2_router
@@ -48,9 +52,15 @@ def create_app(app_config: Config) -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Load the tokenizer vocabulary in the background so the first request doesn't wait on it
+    threading.Thread(target=warm_encoding, args=(config.llm.model,), name="encoding-warmup", daemon=True).start()
+    
     # Initialize database
     engine, database_url = create_engine(config.database)
     init_database(engine, database_url)
+    app.add_event_handler("shutdown", close_engine)
+    app.add_event_handler("shutdown", close_http_session)
+    app.add_event_handler("shutdown", close_http_clients)
     
     # Include routers
     app.include_router(slack_router, prefix="/api/slack", tags=["slack"])
@@ -21,6 +21,7 @@ import asyncio
 
 from ..database import get_session
 from ..services.im import IMServiceFactory
+from ..services.slack import record_event_delivery
 from ..config import get_config
 from ..models.slack_organization import SlackOrganization
 from .im import handle_user_message, get_bot_url
@@ -344,14 +345,25 @@ async def handle_slack_webhook(request: Request, db: Session = Depends(get_sessi
             logger.info(f"Ignoring non-event-callback request type: {request_data.get('type')} (early filtering)")
             return {"status": "ignored"}
         
+        # Create a temporary service for verification and parsing (we'll create the real one in background)
+        temp_slack_service = IMServiceFactory.create_service("slack", {
+            **slack_config.model_dump(),
+            "bot_token": "temp"  # We don't need real token for verification or parsing
+        })
+        
+        # Verify request before anything is recorded, so unsigned requests can't claim event IDs
+        if not temp_slack_service.verify_request(await request.body(), request.headers):
+            raise HTTPException(status_code=401, detail="Invalid request signature")
+        
+        # EARLY SCREENING: Drop Slack's redeliveries of an event we already accepted
+        if not record_event_delivery(request_data.get("event_id")):
+            logger.info(f"Ignoring redelivered Slack event: {request_data.get('event_id')} (early filtering)")
+            return {"status": "ok", "action": "duplicate_ignored"}
+        
         # **DUPLICATE DETECTION**: Check for duplicates before background processing
-        # Parse message to get message data for duplicate detection
+        # Parse message to get message data for duplicate detection; the background task reuses it
+        message_data = None
         try:
-            # Create a temporary service just for parsing (we'll create the real one in background)
-            temp_slack_service = IMServiceFactory.create_service("slack", {
-                **slack_config.model_dump(),
-                "bot_token": "temp"  # We don't need real token for parsing
-            })
             message_data = temp_slack_service.parse_message(request_data)
             
             if message_data["type"] == "message":
@@ -367,7 +379,7 @@ async def handle_slack_webhook(request: Request, db: Session = Depends(get_sessi
             # Continue with background processing if duplicate detection fails
         
         # **IMMEDIATE RESPONSE PATTERN**: Start background processing and return immediately
-        asyncio.create_task(process_slack_message_async(request_data, db, request))
+        asyncio.create_task(process_slack_message_async(request_data, db, request, message_data))
         
         logger.info("Message queued for background processing")
         return {"status": "accepted"}
@@ -385,8 +397,8 @@ async def handle_slack_webhook(request: Request, db: Session = Depends(get_sessi
             raise HTTPException(status_code=500, detail="Internal server error")
 
 
-async def process_slack_message_async(request_data: Dict[str, Any], db: Session, request: Request):
-    """Process Slack message in background after webhook response."""
+async def process_slack_message_async(request_data: Dict[str, Any], db: Session, request: Request, message_data: Optional[Dict[str, Any]] = None):
+    """Process a verified Slack message in background after webhook response, reusing the webhook's parse when given."""
     try:
         logger.info("Starting background processing of Slack message")
         
@@ -408,18 +420,14 @@ async def process_slack_message_async(request_data: Dict[str, Any], db: Session,
         })
         logger.info(f"Slack service created successfully for background processing")
         
-        # Verify request
-        if not slack_service.verify_request(request_data):
-            logger.error("Invalid request signature in background processing")
-            return
-        
-        # Parse message
-        try:
-            message_data = slack_service.parse_message(request_data)
-            logger.info(f"Parsed message in background: {message_data}")
-        except Exception as parse_error:
-            logger.error(f"Failed to parse message in background: {parse_error}")
-            return
+        # Parse message, unless the webhook already did for duplicate detection
+        if message_data is None:
+            try:
+                message_data = slack_service.parse_message(request_data)
+                logger.info(f"Parsed message in background: {message_data}")
+            except Exception as parse_error:
+                logger.error(f"Failed to parse message in background: {parse_error}")
+                return
         
         if message_data["type"] == "message":
             logger.info("Processing user message in background")
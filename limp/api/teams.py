@@ -52,7 +52,7 @@ async def handle_teams_webhook(request: Request, db: Session = Depends(get_sessi
         teams_service = IMServiceFactory.create_service("teams", teams_config.model_dump())
         
         # Verify request
-        if not teams_service.verify_request(request_data):
+        if not teams_service.verify_request(await request.body(), request.headers):
             raise HTTPException(status_code=401, detail="Invalid request signature")
         
         # Get authorization header
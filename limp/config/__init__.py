@@ -2,6 +2,6 @@
 Configuration management for LIMP system.
 """
 
-from .config import Config, load_config, get_config, set_config, DatabaseConfig, LLMConfig, OAuth2Config, ExternalSystemConfig, IMPlatformConfig, AdminConfig, AlertConfig, LoggingConfig, BotConfig, get_env_config, initialize_env_config, EnvironmentConfig
+from .config import Config, load_config, get_config, set_config, DatabaseConfig, LLMConfig, OAuth2Config, ExternalSystemConfig, IMPlatformConfig, AdminConfig, AlertConfig, LoggingConfig, BotConfig, get_env_config, initialize_env_config, EnvironmentConfig, mask_url_password
 
-__all__ = ["Config", "load_config", "get_config", "set_config", "DatabaseConfig", "LLMConfig", "OAuth2Config", "ExternalSystemConfig", "IMPlatformConfig", "AdminConfig", "AlertConfig", "LoggingConfig", "BotConfig", "get_env_config", "initialize_env_config", "EnvironmentConfig"]
+__all__ = ["Config", "load_config", "get_config", "set_config", "DatabaseConfig", "LLMConfig", "OAuth2Config", "ExternalSystemConfig", "IMPlatformConfig", "AdminConfig", "AlertConfig", "LoggingConfig", "BotConfig", "get_env_config", "initialize_env_config", "EnvironmentConfig", "mask_url_password"]
@@ -2,7 +2,7 @@
 Database connection and session management for LIMP system.
 """
 
-from .connection import get_database_url, create_engine, get_session, init_database
+from .connection import get_database_url, create_engine, close_engine, get_session, init_database
 
-__all__ = ["get_database_url", "create_engine", "get_session", "init_database"]
+__all__ = ["get_database_url", "create_engine", "close_engine", "get_session", "init_database"]
 
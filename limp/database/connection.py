@@ -2,13 +2,33 @@
 Database connection and session management.
 """
 
-from sqlalchemy import create_engine as sa_create_engine
+from sqlalchemy import create_engine as sa_create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from typing import Any, Generator, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import logging
+import os
+import random
+import threading
+import time
 
-from ..config import DatabaseConfig
+try:
+    from alembic.config import Config as AlembicConfig
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    from alembic import command
+except ImportError:
+    # Alembic is only needed for migrations on persistent databases
+    AlembicConfig = None
+    MigrationContext = None
+    ScriptDirectory = None
+    command = None
+
+from ..config import DatabaseConfig, mask_url_password
 from ..models.base import Base
 
 logger = logging.getLogger(__name__)
@@ -16,6 +36,62 @@ logger = logging.getLogger(__name__)
 # Global engine variable
 _engine = None
 
+# Session factory bound to the global engine, built once in create_engine
+_SessionLocal = None
+
+# Guards swapping the global engine and session factory
+_engine_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class _PoolTuning:
+    """Connection and pool settings read from the environment."""
+    connection_timeout: int
+    pool_size: int
+    max_overflow: int
+    pool_timeout: int
+    pool_recycle: int
+    pool_pre_ping: bool
+    ping_stale_seconds: int
+    null_pool: bool
+    pool_warmup: bool
+    keepalives_idle: int
+    keepalives_interval: int
+    keepalives_count: int
+    statement_timeout_ms: int
+    idle_in_transaction_timeout_ms: int
+    prepare_threshold: int
+    batch_page_size: int
+    insert_page_size: int
+    query_cache_size: int
+
+
+def _pool_tuning() -> _PoolTuning:
+    """Read the connection and pool settings from the environment."""
+    return _PoolTuning(
+        connection_timeout=int(os.getenv("DATABASE_CONNECTION_TIMEOUT", "30")),
+        pool_size=int(os.getenv("DATABASE_POOL_SIZE", "20")),
+        max_overflow=int(os.getenv("DATABASE_MAX_OVERFLOW", "10")),
+        # Add pool timeout to prevent hanging
+        pool_timeout=int(os.getenv("DATABASE_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.getenv("DATABASE_POOL_RECYCLE", "3600")),  # 1 hour
+        # pool_recycle is the primary stale-connection guard; pinging is opt-in
+        pool_pre_ping=os.getenv("DATABASE_POOL_PRE_PING", "false").lower() == "true",
+        ping_stale_seconds=int(os.getenv("DATABASE_PING_STALE_SECONDS", "30")),
+        null_pool=os.getenv("DATABASE_POOL", "queue").lower() == "null",
+        pool_warmup=os.getenv("DATABASE_POOL_WARMUP", "false").lower() == "true",
+        keepalives_idle=int(os.getenv("DATABASE_KEEPALIVES_IDLE", "30")),
+        keepalives_interval=int(os.getenv("DATABASE_KEEPALIVES_INTERVAL", "10")),
+        keepalives_count=int(os.getenv("DATABASE_KEEPALIVES_COUNT", "3")),
+        # Server-side timeouts in milliseconds (0 disables)
+        statement_timeout_ms=int(os.getenv("DATABASE_STATEMENT_TIMEOUT_MS", "30000")),
+        idle_in_transaction_timeout_ms=int(os.getenv("DATABASE_IDLE_IN_TRANSACTION_TIMEOUT_MS", "60000")),
+        prepare_threshold=int(os.getenv("DATABASE_PREPARE_THRESHOLD", "3")),
+        batch_page_size=int(os.getenv("DATABASE_BATCH_PAGE_SIZE", "500")),
+        insert_page_size=int(os.getenv("DATABASE_INSERT_PAGE_SIZE", "1000")),
+        query_cache_size=int(os.getenv("DATABASE_QUERY_CACHE_SIZE", "1200")),
+    )
+
 
 def get_database_url(config: DatabaseConfig) -> str:
     """Get database URL from configuration."""
@@ -23,102 +99,268 @@ def get_database_url(config: DatabaseConfig) -> str:
 
 
 def create_engine(config: DatabaseConfig) -> Tuple[Any, str]:
-    """Create SQLAlchemy engine."""
-    global _engine
-    import os
+    """Create SQLAlchemy engine, disposing any engine created earlier."""
+    global _engine, _SessionLocal
     
     database_url = get_database_url(config)
     
-    # Get connection timeout from environment
-    connection_timeout = int(os.getenv("DATABASE_CONNECTION_TIMEOUT", "30"))
-    
-    logger.debug(f"Creating database engine with URL: {database_url}")
+    logger.debug(f"Creating database engine with URL: {mask_url_password(database_url)}")
     
     if database_url.startswith("sqlite"):
-        _engine = sa_create_engine(
+        engine = sa_create_engine(
             database_url,
             echo=config.echo,
             poolclass=StaticPool,
             connect_args={"check_same_thread": False}
         )
+        if _is_sqlite_file(database_url):
+            _register_sqlite_pragmas(engine)
     else:
+        tuning = _pool_tuning()
+        drivername = make_url(database_url).drivername
+        
         connect_args = {}
         if database_url.startswith("postgresql"):
             connect_args.update({
-                "connect_timeout": connection_timeout,
+                "connect_timeout": tuning.connection_timeout,
                 "application_name": "limp",
                 "sslmode": "prefer",  # Try SSL first, fallback to non-SSL
                 "gssencmode": "disable",  # Disable GSSAPI encryption
+                # Let the server cancel runaway queries and abandoned transactions (0 disables)
+                "options": _server_timeout_options(tuning),
+                # Detect connections silently dropped by NAT/load balancers
+                "keepalives": 1,
+                "keepalives_idle": tuning.keepalives_idle,
+                "keepalives_interval": tuning.keepalives_interval,
+                "keepalives_count": tuning.keepalives_count,
             })
+            if drivername == "postgresql+psycopg":
+                # psycopg3 server-side prepares any statement seen this many times (Bind/Execute only)
+                connect_args["prepare_threshold"] = tuning.prepare_threshold
         
-        # Add pool timeout to prevent hanging
-        pool_timeout = int(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
-        pool_recycle = int(os.getenv("DATABASE_POOL_RECYCLE", "3600"))  # 1 hour
+        if tuning.null_pool:
+            # An external pooler (PgBouncer, Odyssey) owns pooling; open a connection per checkout
+            pool_kwargs = {"poolclass": NullPool}
+        else:
+            # Size the QueuePool for concurrent FastAPI requests instead of the default 5
+            pool_kwargs = {
+                "pool_size": tuning.pool_size,
+                "max_overflow": tuning.max_overflow,
+                "pool_timeout": tuning.pool_timeout,
+                "pool_recycle": tuning.pool_recycle,
+                # Ping on every checkout only when no staleness threshold is set
+                "pool_pre_ping": tuning.pool_pre_ping and tuning.ping_stale_seconds <= 0,
+            }
+        
+        dialect_kwargs = {}
+        if drivername in ("postgresql", "postgresql+psycopg2"):
+            # Batch executemany() so add_all()/flush of many Message rows is a few round-trips, not one per row.
+            # insertmanyvalues covers INSERTs (execute_values in SQLAlchemy 1.x); execute_batch covers UPDATE/DELETE.
+            dialect_kwargs = {
+                "executemany_mode": "values_plus_batch",
+                "executemany_batch_page_size": tuning.batch_page_size,
+                "insertmanyvalues_page_size": tuning.insert_page_size,
+            }
         
-        _engine = sa_create_engine(
+        engine = sa_create_engine(
             database_url,
             echo=config.echo,
             connect_args=connect_args,
-            pool_timeout=pool_timeout,
-            pool_recycle=pool_recycle,
-            pool_pre_ping=True  # Verify connections before use
+            # The same few statement shapes repeat forever; keep all their compiled forms cached
+            query_cache_size=tuning.query_cache_size,
+            **pool_kwargs,
+            **dialect_kwargs
         )
+        
+        if not tuning.null_pool and tuning.pool_pre_ping and tuning.ping_stale_seconds > 0:
+            _register_stale_ping(engine, tuning.ping_stale_seconds)
+        
+        if not tuning.null_pool and tuning.pool_warmup:
+            _warm_pool(engine, tuning.pool_size)
+    
+    # Build the session factory once; get_session reuses it on every request
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+    
+    with _engine_lock:
+        # Release the previous engine's pooled connections instead of leaving them to GC
+        if _engine is not None:
+            _engine.dispose()
+        _engine, _SessionLocal = engine, session_factory
     
-    return _engine, database_url
+    return engine, database_url
+
+
+def close_engine() -> None:
+    """Dispose the global engine and close its pooled connections."""
+    global _engine, _SessionLocal
+    
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine, _SessionLocal = None, None
+
+
+def _server_timeout_options(tuning: _PoolTuning) -> str:
+    """libpq startup options applying the server-side timeouts."""
+    return (
+        f"-c statement_timeout={tuning.statement_timeout_ms} "
+        f"-c idle_in_transaction_session_timeout={tuning.idle_in_transaction_timeout_ms}"
+    )
+
+
+def _is_sqlite_file(database_url: str) -> bool:
+    """Whether a SQLite URL points at a file rather than an in-memory database."""
+    database = make_url(database_url).database
+    return bool(database) and database != ":memory:" and "mode=memory" not in database_url
+
+
+def _register_sqlite_pragmas(engine) -> None:
+    """Tune every new SQLite connection for WAL journaling and memory-mapped reads."""
+    
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # WAL + NORMAL sync avoids an fsync per commit; still durable across application crashes
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+            cursor.execute("PRAGMA cache_size=-64000")  # ~64 MB
+            cursor.execute("PRAGMA busy_timeout=5000")
+        finally:
+            cursor.close()
+
+
+def _warm_pool(engine, size: int) -> None:
+    """Open size pooled connections in parallel so early requests skip the connect handshake."""
+    if size <= 0:
+        # A zero-size pool keeps no idle connections to warm
+        return
+    
+    with ThreadPoolExecutor(max_workers=size) as executor:
+        futures = [executor.submit(engine.connect) for _ in range(size)]
+    
+    # Every connection is held until all are open, otherwise the pool hands the same one back
+    connections = []
+    errors = []
+    for future in futures:
+        try:
+            connections.append(future.result())
+        except Exception as e:
+            errors.append(e)
+    
+    for connection in connections:
+        connection.close()
+    
+    if errors:
+        # The database may not be up yet; requests will connect lazily instead
+        logger.warning(f"Database pool warmup opened {len(connections)}/{size} connections: {errors[0]}")
+    else:
+        logger.info(f"Warmed database pool with {len(connections)} connections")
+
+
+def _register_stale_ping(engine, stale_seconds: int) -> None:
+    """Ping pooled connections on checkout only if they sat idle longer than stale_seconds."""
+    
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+    
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at <= stale_seconds:
+            return
+        
+        try:
+            # Prefer the driver's native ping (e.g. PyMySQL), which skips query parsing
+            ping = getattr(dbapi_connection, "ping", None)
+            if callable(ping):
+                ping(reconnect=True)
+            else:
+                cursor = dbapi_connection.cursor()
+                try:
+                    cursor.execute("SELECT 1")
+                finally:
+                    cursor.close()
+        except Exception as e:
+            logger.warning(f"Stale pooled connection failed ping, reconnecting: {e}")
+            # Tells the pool to discard this connection and retry with a fresh one
+            raise DisconnectionError() from e
 
 
 def get_session() -> Generator[Session, None, None]:
     """Get database session - FastAPI dependency."""
-    if _engine is None:
+    if _SessionLocal is None:
         raise RuntimeError("Database engine not initialized. Call create_engine first.")
     
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
-    session = SessionLocal()
+    session = _SessionLocal()
     try:
         yield session
     finally:
         session.close()
 
 
+def _schema_is_current(engine, alembic_cfg) -> bool:
+    """Cheaply check whether the database is already at the Alembic head revision(s)."""
+    script_heads = set(ScriptDirectory.from_config(alembic_cfg).get_heads())
+    with engine.connect() as connection:
+        current_heads = set(MigrationContext.configure(connection).get_current_heads())
+    
+    logger.debug(f"Alembic revisions: database={sorted(current_heads)}, scripts={sorted(script_heads)}")
+    return current_heads == script_heads
+
+
 def init_database(engine, original_database_url=None):
     """Initialize database tables using Alembic migrations."""
-    import time
-    import os
-    
     # Configuration for retry logic
     max_attempts = int(os.getenv("DATABASE_INIT_MAX_ATTEMPTS", "5"))
     retry_delay = int(os.getenv("DATABASE_INIT_RETRY_DELAY", "10"))  # seconds
     connection_timeout = int(os.getenv("DATABASE_CONNECTION_TIMEOUT", "30"))  # seconds
+    max_delay = int(os.getenv("DATABASE_INIT_MAX_DELAY", "60"))  # cap on a single backoff sleep
+    max_wall_seconds = int(os.getenv("DATABASE_INIT_MAX_WALL_SECONDS", "300"))  # cap on total time spent retrying
+    
+    logger.info(f"Database initialization: max_attempts={max_attempts}, retry_delay={retry_delay}s, timeout={connection_timeout}s, max_delay={max_delay}s, max_wall={max_wall_seconds}s")
+    
+    deadline = time.monotonic() + max_wall_seconds
+    prev_delay = retry_delay
     
-    logger.info(f"Database initialization: max_attempts={max_attempts}, retry_delay={retry_delay}s, timeout={connection_timeout}s")
+    is_memory_database = engine.url.database == ':memory:'
+    
+    # Use Alembic migrations instead of create_all; the config is built once and reused across retries
+    alembic_cfg = None
+    if not is_memory_database:
+        if AlembicConfig is None:
+            raise RuntimeError("Alembic is required to initialize a persistent database")
+        
+        logger.info(f"Initializing database with URL: {engine.url}")
+        alembic_cfg = AlembicConfig("alembic.ini")
+        
+        # CRITICAL: Use the original database URL, not the sanitized engine.url
+        # This ensures Alembic uses the real password, not the sanitized one
+        alembic_database_url = original_database_url or str(engine.url)
+        alembic_cfg.set_main_option("sqlalchemy.url", alembic_database_url)
+        
+        # Also set it in the alembic section
+        alembic_cfg.set_section_option("alembic", "sqlalchemy.url", alembic_database_url)
+        
+        # Verify the URL was set correctly
+        final_url = alembic_cfg.get_main_option("sqlalchemy.url")
+        logger.debug(f"Alembic will use URL: {final_url}")
     
     for attempt in range(1, max_attempts + 1):
         try:
             logger.info(f"Database initialization attempt {attempt}/{max_attempts}")
             
-            # Use Alembic migrations instead of create_all
-            from alembic.config import Config as AlembicConfig
-            from alembic import command
-
-            if engine.url.database == ':memory:':
+            if is_memory_database:
                 Base.metadata.create_all(bind=engine)
                 logger.info("Created in-memory database tables successfully")
                 return  # Success, exit the retry loop
-            else:        
-                logger.info(f"Initializing database with URL: {engine.url}")
-                alembic_cfg = AlembicConfig("alembic.ini")
-                
-                # CRITICAL: Use the original database URL, not the sanitized engine.url
-                # This ensures Alembic uses the real password, not the sanitized one
-                alembic_database_url = original_database_url or str(engine.url)
-                alembic_cfg.set_main_option("sqlalchemy.url", alembic_database_url)
-                
-                # Also set it in the alembic section
-                alembic_cfg.set_section_option("alembic", "sqlalchemy.url", alembic_database_url)
-                
-                # Verify the URL was set correctly
-                final_url = alembic_cfg.get_main_option("sqlalchemy.url")
-                logger.debug(f"Alembic will use URL: {final_url}")
+            else:
+                if _schema_is_current(engine, alembic_cfg):
+                    logger.info("Database schema current, skipping upgrade")
+                    return  # Success, exit the retry loop
                 
                 # Run migrations with the correct URL
                 command.upgrade(alembic_cfg, "head")
@@ -129,15 +371,17 @@ def init_database(engine, original_database_url=None):
             logger.error(f"Database initialization attempt {attempt}/{max_attempts} failed: {e}")
             logger.debug(f"Engine URL was: {engine.url}")
             
-            if attempt < max_attempts:
-                # Progressive backoff
-                delay = (attempt ** 2) * retry_delay
-                logger.info(f"Retrying in {delay} seconds (progressive backoff: attempt {attempt}, delaying for {delay}s)...")
+            # Decorrelated jitter: spreads reconnects from pods restarting together, capped per sleep
+            delay = min(max_delay, random.uniform(retry_delay, prev_delay * 3))
+            prev_delay = delay
+            
+            if attempt < max_attempts and time.monotonic() + delay <= deadline:
+                logger.info(f"Retrying in {delay:.1f} seconds (jittered backoff: attempt {attempt}, delaying for {delay:.1f}s)...")
                 time.sleep(delay)
             else:
-                logger.error(f"Database initialization failed after {max_attempts} attempts")
+                logger.error(f"Database initialization failed after {attempt} attempts")
                 logger.error("Container will exit to prevent infinite restart loops")
-                raise RuntimeError(f"Database initialization failed after {max_attempts} attempts. Last error: {e}")
+                raise RuntimeError(f"Database initialization failed after {attempt} attempts. Last error: {e}")
     
     # This should never be reached due to the raise above, but just in case
     raise RuntimeError("Database initialization failed - unexpected end of retry loop")
\ No newline at end of file
@@ -3,11 +3,15 @@ Conversation and message models for chat history.
 """
 
 from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from .base import Base
 
+# Stored as binary jsonb on PostgreSQL (no reparse on read, indexable); generic JSON elsewhere
+JSONType = JSON().with_variant(JSONB(astext_type=Text()), "postgresql")
+
 
 class Conversation(Base):
     """Conversation context per user."""
@@ -16,12 +20,17 @@ class Conversation(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    channel_id = Column(String, nullable=True, index=True)  # Channel identifier (Slack channel, Teams channel, etc.)
-    thread_id = Column(String, nullable=True, index=True)  # Thread identifier (Slack thread_ts, Teams conversation_id, etc.)
-    context = Column(JSON, nullable=True)  # Additional context data
+    channel_id = Column(String, nullable=True)  # Channel identifier (Slack channel, Teams channel, etc.)
+    thread_id = Column(String, nullable=True)  # Thread identifier (Slack thread_ts, Teams conversation_id, etc.)
+    context = Column(JSONType, nullable=True)  # Additional context data
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Composite index for conversation routing lookups (user_id, channel_id, thread_id)
+    __table_args__ = (
+        Index('ix_conversations_user_channel_thread', 'user_id', 'channel_id', 'thread_id'),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
@@ -40,12 +49,14 @@ class Message(Base):
     role = Column(String, nullable=False)  # 'user', 'assistant', 'system', 'tool_request', 'tool_response', 'summary'
     content = Column(Text, nullable=False)
     external_id = Column(String, nullable=True)  # Unique identifier from external system
-    message_metadata = Column(JSON, nullable=True)  # Additional message metadata
+    message_metadata = Column(JSONType, nullable=True)  # Additional message metadata
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    # Index for external_id to support duplicate detection
+    # Unique index for external_id so duplicate deliveries are rejected by the database, and a composite index
+    # serving "messages of a conversation ordered by created_at" history lookups
     __table_args__ = (
-        Index('ix_messages_external_id', 'external_id'),
+        Index('ix_messages_external_id', 'external_id', unique=True),
+        Index('ix_messages_conversation_created', 'conversation_id', 'created_at'),
     )
     
     # Relationship
@@ -53,3 +64,8 @@ class Message(Base):
     
     def __repr__(self):
         return f"<Message(id={self.id}, role='{self.role}', conversation_id={self.conversation_id})>"
+
+
+# Columns read when replaying history. Querying these instead of Message yields lightweight
+# Row tuples (same attribute names) without per-instance ORM state or identity-map entries.
+MESSAGE_HISTORY_COLUMNS = (Message.role, Message.content, Message.message_metadata, Message.created_at)
@@ -3,37 +3,169 @@ Context management service for handling conversation history and summarization.
 """
 
 import tiktoken
-import openai
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
+import hashlib
 import logging
+import os
+import re
+import threading
 from sqlalchemy.orm import Session
 
 from ..config import LLMConfig
-from ..models.conversation import Message
+from .llm import _get_openai_client
+from ..models.conversation import Message, MESSAGE_HISTORY_COLUMNS
 
 logger = logging.getLogger(__name__)
 
+# Roles left out of summaries when tool calls are excluded
+_TOOL_ROLES = frozenset(("tool", "tool_request", "tool_response"))
+
+# Stand-in for messages stored without metadata; never mutated
+_EMPTY_METADATA: Dict[str, Any] = {}
+
+# Below this many texts, encoding inline beats handing chunks to the encoder threads
+_PARALLEL_ENCODE_MIN_TEXTS = 64
+
+# Shared encoder threads; the tokenizer releases the GIL while encoding, so chunks run on separate cores
+_ENCODE_WORKERS = min(8, os.cpu_count() or 1)
+_encode_executor = ThreadPoolExecutor(max_workers=_ENCODE_WORKERS, thread_name_prefix="token-encode")
+
+# Token counts of recently seen texts, keyed by (encoding name, content digest). Shared across
+# ContextManager instances so each turn only encodes messages added since the previous one.
+_TOKEN_COUNT_CACHE_SIZE = 4096
+_token_count_cache: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+_token_count_lock = threading.Lock()
+
+
+# Context window sizes for known models (in tokens)
+_MODEL_CONTEXT_LIMITS = {
+    # GPT-3.5 models
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16384,
+    "gpt-3.5-turbo-1106": 16384,
+    "gpt-3.5-turbo-0125": 16384,
+    
+    # GPT-4 models
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-0613": 8192,
+    "gpt-4-32k-0613": 32768,
+    "gpt-4-1106-preview": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-turbo-preview": 128000,
+    "gpt-4-turbo-2024-04-09": 128000,
+    "gpt-4-turbo-2024-11-20": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-2024-05-13": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4o-mini-2024-07-18": 128000,
+    
+    # GPT-5 models (future-proofing)
+    "gpt-5": 200000,  # Estimated based on trend
+    "gpt-5-turbo": 200000,
+    "gpt-5-32k": 200000,
+    "gpt-5-128k": 200000,
+    
+    # Other models
+    "o1-preview": 128000,
+    "o1-mini": 128000,
+}
+
+
+# Model families for names not in the table above
+_MODEL_FAMILY_PATTERN = re.compile(r"gpt-5|gpt-4|gpt-3\.5|claude")
+
+# Family -> (ordered (qualifiers, size) rules, default size)
+_MODEL_FAMILY_WINDOWS = {
+    "gpt-5": ((), 200000),  # Estimated for all GPT-5 variants
+    "gpt-4": (((("32k",), 32768), (("128k", "turbo", "4o", "vision"), 128000)), 8192),
+    "gpt-3.5": (((("16k",), 16384),), 4096),
+    "claude": ((), 200000),  # Claude models have large context windows
+}
+
+
+@lru_cache(maxsize=64)
+def _get_model_context_window_size(model_name: str) -> int:
+    """Get context window size for a specific model using lookup table."""
+    # Direct lookup
+    if model_name in _MODEL_CONTEXT_LIMITS:
+        return _MODEL_CONTEXT_LIMITS[model_name]
+    
+    # Pattern matching for variants: one scan finds the family, then its qualifier rules apply in order
+    model_lower = model_name.lower()
+    family_match = _MODEL_FAMILY_PATTERN.search(model_lower)
+    if family_match:
+        qualifier_rules, default_size = _MODEL_FAMILY_WINDOWS[family_match.group()]
+        for qualifiers, size in qualifier_rules:
+            if any(qualifier in model_lower for qualifier in qualifiers):
+                return size
+        return default_size
+    
+    # Default fallback
+    logger.warning(f"Unknown model '{model_name}', using default context window size of 8192")
+    return 8192
+
+
+def _encode_counts(encoding, texts: List[str]) -> List[int]:
+    """Token count of each text."""
+    return [len(encoding.encode_ordinary(text)) for text in texts]
+
+
+def _encode_counts_parallel(encoding, texts: List[str]) -> List[int]:
+    """Token count of each text, encoding contiguous chunks on the shared encoder threads."""
+    chunk_size = -(-len(texts) // _ENCODE_WORKERS)  # ceiling division
+    chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    counts = []
+    for chunk_counts in _encode_executor.map(lambda chunk: _encode_counts(encoding, chunk), chunks):
+        counts.extend(chunk_counts)
+    return counts
+
+
+@lru_cache(maxsize=8)
+def _summary_system_prompt(summary_max_tokens: int) -> str:
+    """Summarization instructions; fixed per configured limit so every call shares the prefix."""
+    return (
+        "You are a helpful assistant that creates concise summaries of conversations. "
+        "Summarize the conversation in the user message in a concise way, preserving key "
+        f"information and context. The summary should be no more than {summary_max_tokens} tokens."
+    )
+
+
+def _load_encoding(model_name: str):
+    """Load the BPE encoding for a model; the tokenizer library caches it process-wide."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        # Fallback to cl100k_base for unknown models
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def warm_encoding(model_name: str) -> None:
+    """Load the model's encoding ahead of the first request so token counting doesn't pay for it."""
+    try:
+        _load_encoding(model_name)
+        logger.info(f"Loaded token encoding for model '{model_name}'")
+    except Exception as e:
+        # The first count_tokens call will retry the load
+        logger.warning(f"Failed to preload token encoding for model '{model_name}': {e}")
+
 
 class ContextManager:
     """Manages conversation context and summarization."""
     
     def __init__(self, llm_config: LLMConfig):
         self.config = llm_config
-        self.client = openai.OpenAI(
-            api_key=llm_config.api_key,
-            base_url=llm_config.base_url
-        )
+        self.client = _get_openai_client(llm_config.api_key, llm_config.base_url)
         self._context_window_size = None
         self._encoding = None
     
     def _get_encoding(self):
         """Get tiktoken encoding for the model."""
         if self._encoding is None:
-            try:
-                self._encoding = tiktoken.encoding_for_model(self.config.model)
-            except KeyError:
-                # Fallback to cl100k_base for unknown models
-                self._encoding = tiktoken.get_encoding("cl100k_base")
+            self._encoding = _load_encoding(self.config.model)
         return self._encoding
     
     def _get_context_window_size(self) -> int:
@@ -43,116 +175,87 @@ class ContextManager:
                 self._context_window_size = self.config.context_window_size
             else:
                 # Use lookup table for known models
-                self._context_window_size = self._get_model_context_window_size(self.config.model)
+                self._context_window_size = _get_model_context_window_size(self.config.model)
         
         return self._context_window_size
     
-    def _get_model_context_window_size(self, model_name: str) -> int:
-        """Get context window size for a specific model using lookup table."""
-        # Context window sizes for known models (in tokens)
-        context_limits = {
-            # GPT-3.5 models
-            "gpt-3.5-turbo": 4096,
-            "gpt-3.5-turbo-16k": 16384,
-            "gpt-3.5-turbo-1106": 16384,
-            "gpt-3.5-turbo-0125": 16384,
-            
-            # GPT-4 models
-            "gpt-4": 8192,
-            "gpt-4-32k": 32768,
-            "gpt-4-0613": 8192,
-            "gpt-4-32k-0613": 32768,
-            "gpt-4-1106-preview": 128000,
-            "gpt-4-turbo": 128000,
-            "gpt-4-turbo-preview": 128000,
-            "gpt-4-turbo-2024-04-09": 128000,
-            "gpt-4-turbo-2024-11-20": 128000,
-            "gpt-4o": 128000,
-            "gpt-4o-2024-05-13": 128000,
-            "gpt-4o-mini": 128000,
-            "gpt-4o-mini-2024-07-18": 128000,
-            
-            # GPT-5 models (future-proofing)
-            "gpt-5": 200000,  # Estimated based on trend
-            "gpt-5-turbo": 200000,
-            "gpt-5-32k": 200000,
-            "gpt-5-128k": 200000,
-            
-            # Other models
-            "o1-preview": 128000,
-            "o1-mini": 128000,
-        }
-        
-        # Direct lookup
-        if model_name in context_limits:
-            return context_limits[model_name]
-        
-        # Pattern matching for variants
-        model_lower = model_name.lower()
-        
-        # GPT-5 pattern matching
-        if "gpt-5" in model_lower:
-            if "32k" in model_lower:
-                return 200000  # Estimated
-            elif "128k" in model_lower:
-                return 200000  # Estimated
-            else:
-                return 200000  # Default GPT-5
-        
-        # GPT-4 pattern matching
-        elif "gpt-4" in model_lower:
-            if "32k" in model_lower:
-                return 32768
-            elif "128k" in model_lower or "turbo" in model_lower or "o" in model_lower:
-                return 128000
-            else:
-                return 8192  # Default GPT-4
-        
-        # GPT-3.5 pattern matching
-        elif "gpt-3.5" in model_lower:
-            if "16k" in model_lower:
-                return 16384
-            else:
-                return 4096  # Default GPT-3.5
-        
-        # Claude pattern matching
-        elif "claude" in model_lower:
-            return 200000  # Claude models have large context windows
-        
-        # Default fallback
-        logger.warning(f"Unknown model '{model_name}', using default context window size of 8192")
-        return 8192
-    
     def count_tokens(self, messages: List[Dict[str, str]]) -> int:
         """Count tokens in a list of messages."""
-        encoding = self._get_encoding()
-        total_tokens = 0
+        texts, overhead_tokens = self._collect_token_texts(messages)
+        return self._count_text_tokens(texts) + overhead_tokens
+    
+    def _collect_token_texts(self, messages: List[Dict[str, str]]) -> Tuple[List[str], int]:
+        """Collect the texts to encode for messages and their fixed token overhead."""
+        texts = []
+        tool_call_count = 0
         
         for message in messages:
             # Count tokens for the message content
             content = message.get("content", "")
             if content:
-                total_tokens += len(encoding.encode(content))
-            
-            # Add tokens for role and other metadata
-            total_tokens += 4  # Every message has ~4 tokens of overhead
+                texts.append(content)
             
             # Add tokens for tool calls if present
-            if "tool_calls" in message:
-                for tool_call in message["tool_calls"]:
-                    total_tokens += len(encoding.encode(tool_call.get("function", {}).get("name", "")))
-                    total_tokens += len(encoding.encode(tool_call.get("function", {}).get("arguments", "")))
-                    total_tokens += 4  # Tool call overhead
+            for tool_call in message.get("tool_calls") or ():
+                function = tool_call.get("function", {})
+                texts.append(function.get("name", ""))
+                texts.append(function.get("arguments", ""))
+                tool_call_count += 1
+        
+        # Every message has ~4 tokens of overhead for role and other metadata, as does every tool call
+        return texts, 4 * (len(messages) + tool_call_count)
+    
+    def _count_text_tokens(self, texts: List[str]) -> int:
+        """Count tokens across texts, reusing cached counts and encoding only unseen texts."""
+        if not texts:
+            return 0
+        
+        encoding = self._get_encoding()
+        keys = [(encoding.name, hashlib.blake2b(text.encode(), digest_size=16).digest()) for text in texts]
+        counts = {}
+        missing = {}  # cache key -> text, one entry per distinct unseen text
+        
+        with _token_count_lock:
+            for key, text in zip(keys, texts):
+                if key in counts or key in missing:
+                    continue
+                count = _token_count_cache.get(key)
+                if count is None:
+                    missing[key] = text
+                else:
+                    _token_count_cache.move_to_end(key)
+                    counts[key] = count
+        
+        if missing:
+            missing_texts = list(missing.values())
+            if len(missing_texts) >= _PARALLEL_ENCODE_MIN_TEXTS and _ENCODE_WORKERS > 1:
+                encoded_counts = _encode_counts_parallel(encoding, missing_texts)
+            else:
+                encoded_counts = _encode_counts(encoding, missing_texts)
+            counts.update(zip(missing, encoded_counts))
+            
+            with _token_count_lock:
+                for key in missing:
+                    _token_count_cache[key] = counts[key]
+                while len(_token_count_cache) > _TOKEN_COUNT_CACHE_SIZE:
+                    _token_count_cache.popitem(last=False)
         
-        return total_tokens
+        return sum(counts[key] for key in keys)
     
     def should_summarize(self, messages: List[Dict[str, str]]) -> bool:
         """Check if conversation should be summarized based on context threshold."""
-        current_tokens = self.count_tokens(messages)
         context_window_size = self._get_context_window_size()
         threshold_tokens = int(context_window_size * self.config.context_threshold)
         
-        logger.debug(f"Context check: {current_tokens}/{context_window_size} tokens ({current_tokens/context_window_size:.2%})")
+        # Every BPE token covers at least one byte, so the UTF-8 size bounds the token count from above;
+        # when even that bound is under the threshold, skip encoding entirely
+        texts, overhead_tokens = self._collect_token_texts(messages)
+        if sum(len(text.encode("utf-8")) for text in texts) + overhead_tokens < threshold_tokens:
+            return False
+        
+        current_tokens = self._count_text_tokens(texts) + overhead_tokens
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Context check: {current_tokens}/{context_window_size} tokens ({current_tokens/context_window_size:.2%})")
         return current_tokens >= threshold_tokens
     
     def get_context_usage_percentage(self, messages: List[Dict[str, str]], system_prompts: List[str] = None) -> float:
@@ -163,13 +266,10 @@ class ContextManager:
         # Count tokens in messages
         message_tokens = self.count_tokens(messages) if messages else 0
         
-        # Count tokens in system prompts
+        # Count tokens in system prompts; they rarely change, so these usually come from the cache
         system_tokens = 0
         if system_prompts:
-            for prompt in system_prompts:
-                encoding = self._get_encoding()
-                system_tokens += len(encoding.encode(prompt))
-                system_tokens += 4  # Message overhead
+            system_tokens = self._count_text_tokens(system_prompts) + 4 * len(system_prompts)  # Message overhead
         
         total_tokens = message_tokens + system_tokens
         context_window_size = self._get_context_window_size()
@@ -191,36 +291,29 @@ class ContextManager:
     ) -> str:
         """Summarize conversation history, excluding tool calls if requested."""
         # Filter out tool calls if requested
-        filtered_messages = []
-        for message in messages:
-            if exclude_tool_calls and message.get("role") in ["tool", "tool_request", "tool_response"]:
-                continue
-            filtered_messages.append(message)
+        if exclude_tool_calls:
+            filtered_messages = [message for message in messages if message.get("role") not in _TOOL_ROLES]
+        else:
+            filtered_messages = messages
         
         if not filtered_messages:
             return "No conversation history to summarize."
         
-        # Create a prompt for summarization
-        conversation_text = ""
-        for message in filtered_messages:
-            role = message.get("role", "unknown")
-            content = message.get("content", "")
-            if content:
-                conversation_text += f"{role}: {content}\n"
-        
-        summary_prompt = f"""Please summarize the following conversation in a concise way, preserving key information and context. The summary should be no more than {self.config.summary_max_tokens} tokens.
-
-Conversation:
-{conversation_text}
-
-Summary:"""
+        # Conversation transcript for the summarizer, joined in one allocation
+        conversation_text = "".join(
+            f"{message.get('role', 'unknown')}: {message['content']}\n"
+            for message in filtered_messages
+            if message.get("content")
+        )
         
         try:
+            # Static instructions first, conversation last, so the prompt prefix is identical
+            # across calls and eligible for the provider's prompt caching
             response = self.client.chat.completions.create(
                 model=self.config.model,
                 messages=[
-                    {"role": "system", "content": "You are a helpful assistant that creates concise summaries of conversations."},
-                    {"role": "user", "content": summary_prompt}
+                    {"role": "system", "content": _summary_system_prompt(self.config.summary_max_tokens)},
+                    {"role": "user", "content": conversation_text}
                 ],
                 max_tokens=self.config.summary_max_tokens,
                 temperature=0.3  # Lower temperature for more consistent summaries
@@ -247,94 +340,41 @@ Summary:"""
         conversation_id: int
     ) -> List[Dict[str, str]]:
         """Reconstruct conversation history with summaries for context management."""
-        # Get all messages for the conversation
-        messages = db.query(Message).filter(
+        # Get all messages for the conversation; those before the summary are kept too, so one query covers it
+        messages = db.query(*MESSAGE_HISTORY_COLUMNS).filter(
             Message.conversation_id == conversation_id
         ).order_by(Message.created_at.asc()).all()
         
-        if not messages:
-            return []
-        
-        # Find the latest summary
-        latest_summary = None
-        latest_summary_index = -1
-        
-        for i, message in enumerate(messages):
-            if message.role == "summary":
-                latest_summary = message
-                latest_summary_index = i
-        
-        # If no summary exists, return all messages
-        if latest_summary is None:
-            return self._format_messages_for_llm(messages)
-        
-        # Get messages from the beginning up to the summary (preserving all initial context)
-        messages_before_summary = messages[:latest_summary_index]
-        
-        # Get messages after the latest summary
-        messages_after_summary = messages[latest_summary_index + 1:]
-        
-        # Reconstruct history: all initial messages + summary + messages after summary
-        reconstructed = []
-        
-        # Add all messages from the beginning (preserving system messages, etc.)
-        formatted_initial_messages = self._format_messages_for_llm(messages_before_summary)
-        reconstructed.extend(formatted_initial_messages)
-        
-        # Add the summary as a system message
-        if latest_summary:
-            reconstructed.append({
-                "role": "system",
-                "content": f"Previous conversation summary: {latest_summary.content}"
-            })
-        
-        # Add messages after the summary using the existing formatting logic
-        formatted_messages_after_summary = self._format_messages_for_llm(messages_after_summary)
-        reconstructed.extend(formatted_messages_after_summary)
-        
-        return reconstructed
+        return self.reconstruct_history_with_summary_from_messages(messages)
     
     def reconstruct_history_with_summary_from_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
         """Reconstruct conversation history with summaries from a list of messages."""
         if not messages:
             return []
         
-        # Find the latest summary
-        latest_summary = None
-        latest_summary_index = -1
-        
-        for i, message in enumerate(messages):
-            if message.role == "summary":
-                latest_summary = message
-                latest_summary_index = i
+        # Find the latest summary, scanning from the newest message back
+        latest_summary_index = next(
+            (i for i in range(len(messages) - 1, -1, -1) if messages[i].role == "summary"),
+            -1
+        )
         
         # If no summary exists, return all messages
-        if latest_summary is None:
+        if latest_summary_index < 0:
             return self._format_messages_for_llm(messages)
         
-        # Get messages from the beginning up to the summary (preserving all initial context)
-        messages_before_summary = messages[:latest_summary_index]
-        
-        # Get messages after the latest summary
-        messages_after_summary = messages[latest_summary_index + 1:]
+        latest_summary = messages[latest_summary_index]
         
-        # Reconstruct history: all initial messages + summary + messages after summary
-        reconstructed = []
-        
-        # Add all messages from the beginning (preserving system messages, etc.)
-        formatted_initial_messages = self._format_messages_for_llm(messages_before_summary)
-        reconstructed.extend(formatted_initial_messages)
+        # Reconstruct history: all initial messages (system messages, etc.) + summary + messages after summary
+        reconstructed = self._format_messages_for_llm(messages[:latest_summary_index])
         
         # Add the summary as a system message
-        if latest_summary:
-            reconstructed.append({
-                "role": "system",
-                "content": f"Previous conversation summary: {latest_summary.content}"
-            })
+        reconstructed.append({
+            "role": "system",
+            "content": f"Previous conversation summary: {latest_summary.content}"
+        })
         
         # Add messages after the summary using the existing formatting logic
-        formatted_messages_after_summary = self._format_messages_for_llm(messages_after_summary)
-        reconstructed.extend(formatted_messages_after_summary)
+        reconstructed.extend(self._format_messages_for_llm(messages[latest_summary_index + 1:]))
         
         return reconstructed
     
@@ -343,60 +383,61 @@ Summary:"""
         formatted = []
         
         # Track tool calls to optimize - keep only the latest successful tool call
-        tool_calls_by_id = {}  # tool_call_id -> (request_message, response_message)
+        requested_tool_call_ids = set()
+        tool_entries = []  # (index in formatted, tool_call_id) for every tool request/response emitted
         latest_successful_tool_call_id = None
         
-        # First pass: collect all tool calls and find the latest successful one
-        for message in messages:
-            if message.role == "tool_request":
-                tool_call_id = message.message_metadata.get("tool_call_id", "")
-                if tool_call_id:
-                    tool_calls_by_id[tool_call_id] = (message, None)
-            elif message.role == "tool_response":
-                tool_call_id = message.message_metadata.get("tool_call_id", "")
-                success = message.message_metadata.get("success", False)
-                if tool_call_id and tool_call_id in tool_calls_by_id:
-                    tool_calls_by_id[tool_call_id] = (tool_calls_by_id[tool_call_id][0], message)
-                    if success:
-                        latest_successful_tool_call_id = tool_call_id
-        
-        # Second pass: format messages with optimization
+        # Single pass: emit everything in order, remembering where the tool entries went
         for message in messages:
-            if message.role in ["user", "assistant", "system"]:
+            role = message.role
+            if role in ("user", "assistant", "system"):
                 formatted.append({
-                    "role": message.role,
+                    "role": role,
                     "content": message.content
                 })
-            elif message.role == "tool_request":
-                tool_call_id = message.message_metadata.get("tool_call_id", "")
-                # Only include if it's the latest successful tool call or if there are no successful tool calls
-                if (latest_successful_tool_call_id and tool_call_id == latest_successful_tool_call_id) or \
-                   (not latest_successful_tool_call_id and tool_call_id in tool_calls_by_id):
-                    tool_name = message.message_metadata.get("tool_name", "unknown")
-                    tool_arguments = message.message_metadata.get("tool_arguments", "{}")
-                    
-                    formatted.append({
-                        "role": "assistant",
-                        "content": message.content,
-                        "tool_calls": [{
-                            "id": tool_call_id,
-                            "type": "function",
-                            "function": {
-                                "name": tool_name,
-                                "arguments": tool_arguments
-                            }
-                        }]
-                    })
-            elif message.role == "tool_response":
-                tool_call_id = message.message_metadata.get("tool_call_id", "")
-                # Only include if it's the latest successful tool call or if there are no successful tool calls
-                if (latest_successful_tool_call_id and tool_call_id == latest_successful_tool_call_id) or \
-                   (not latest_successful_tool_call_id and tool_call_id in tool_calls_by_id):
-                    formatted.append({
-                        "role": "tool",
-                        "content": message.content,
-                        "tool_call_id": tool_call_id
-                    })
+            elif role == "tool_request":
+                metadata = message.message_metadata or _EMPTY_METADATA
+                tool_call_id = metadata.get("tool_call_id", "")
+                if tool_call_id:
+                    requested_tool_call_ids.add(tool_call_id)
+                tool_name = metadata.get("tool_name", "unknown")
+                tool_arguments = metadata.get("tool_arguments", "{}")
+                
+                tool_entries.append((len(formatted), tool_call_id))
+                formatted.append({
+                    "role": "assistant",
+                    "content": message.content,
+                    "tool_calls": [{
+                        "id": tool_call_id,
+                        "type": "function",
+                        "function": {
+                            "name": tool_name,
+                            "arguments": tool_arguments
+                        }
+                    }]
+                })
+            elif role == "tool_response":
+                metadata = message.message_metadata or _EMPTY_METADATA
+                tool_call_id = metadata.get("tool_call_id", "")
+                success = metadata.get("success", False)
+                if success and tool_call_id in requested_tool_call_ids:
+                    latest_successful_tool_call_id = tool_call_id
+                
+                tool_entries.append((len(formatted), tool_call_id))
+                formatted.append({
+                    "role": "tool",
+                    "content": message.content,
+                    "tool_call_id": tool_call_id
+                })
+        
+        # Only keep the latest successful tool call, or every requested one if none succeeded
+        if latest_successful_tool_call_id:
+            dropped = {index for index, tool_call_id in tool_entries if tool_call_id != latest_successful_tool_call_id}
+        else:
+            dropped = {index for index, tool_call_id in tool_entries if tool_call_id not in requested_tool_call_ids}
+        
+        if dropped:
+            formatted = [entry for index, entry in enumerate(formatted) if index not in dropped]
         
         return formatted
 
@@ -3,7 +3,7 @@ Abstract base class for instant messaging services.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List, Mapping
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,9 +12,12 @@ logger = logging.getLogger(__name__)
 class IMService(ABC):
     """Abstract base class for instant messaging services."""
     
+    # Subclasses declare their own slots; an empty tuple here keeps a __dict__ from coming in through the base
+    __slots__ = ()
+    
     @abstractmethod
-    def verify_request(self, request_data: Dict[str, Any]) -> bool:
-        """Verify incoming request from IM platform."""
+    def verify_request(self, body: bytes, headers: Mapping[str, str]) -> bool:
+        """Verify incoming request from IM platform using its raw body and headers."""
         pass
     
     @abstractmethod
@@ -68,28 +71,43 @@ class IMService(ABC):
         pass
 
 
+def _create_slack_service(config: Dict[str, Any]) -> IMService:
+    """Build a Slack service from platform config."""
+    from .slack import SlackService
+    return SlackService(
+        client_id=config["client_id"],
+        client_secret=config["client_secret"],
+        signing_secret=config.get("signing_secret", ""),
+        bot_token=config.get("bot_token"),
+        app_id=config.get("app_id")
+    )
+
+
+def _create_teams_service(config: Dict[str, Any]) -> IMService:
+    """Build a Teams service from platform config."""
+    from .teams import TeamsService
+    return TeamsService(
+        app_id=config["app_id"],
+        client_id=config["client_id"],
+        client_secret=config["client_secret"]
+    )
+
+
+# Platform key -> service builder; builders import their platform module on first use
+_SERVICE_BUILDERS: Dict[str, Callable[[Dict[str, Any]], IMService]] = {
+    "slack": _create_slack_service,
+    "teams": _create_teams_service,
+}
+
+
 class IMServiceFactory:
     """Factory for creating IM services."""
     
     @staticmethod
     def create_service(platform: str, config: Dict[str, Any]) -> IMService:
         """Create IM service based on platform."""
-        if platform.lower() == "slack":
-            from .slack import SlackService
-            return SlackService(
-                client_id=config["client_id"],
-                client_secret=config["client_secret"],
-                signing_secret=config.get("signing_secret", ""),
-                bot_token=config.get("bot_token"),
-                app_id=config.get("app_id")
-            )
-        elif platform.lower() == "teams":
-            from .teams import TeamsService
-            return TeamsService(
-                app_id=config["app_id"],
-                client_id=config["client_id"],
-                client_secret=config["client_secret"]
-            )
-        else:
+        # Callers pass lowercase keys, so only fall back to lowercasing on a miss
+        builder = _SERVICE_BUILDERS.get(platform) or _SERVICE_BUILDERS.get(platform.lower())
+        if builder is None:
             raise ValueError(f"Unsupported platform: {platform}")
-
+        return builder(config)
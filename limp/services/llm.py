@@ -2,25 +2,138 @@
 LLM service for OpenAI integration.
 """
 
+import httpx
 import openai
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
+import copy
+import hashlib
 import logging
 import json
+import re
+import threading
+import time
+
+try:
+    # Faster JSON for hashing long message histories and tool schemas into response-cache keys
+    import orjson
+except ImportError:
+    orjson = None
 
 from ..config import LLMConfig
 
 logger = logging.getLogger(__name__)
 
 
+def _dumps(data: Any, sort_keys: bool = False) -> bytes:
+    """Serialize data to JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+        except orjson.JSONEncodeError:
+            # orjson is stricter in places (non-str keys, 64-bit integer range); let the stdlib decide
+            pass
+    return json.dumps(data, sort_keys=sort_keys).encode()
+
+
+# Idle connections to the API stay open long enough to be reused by the next user message
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30.0)
+
+
+@lru_cache(maxsize=1)
+def _get_http_client() -> httpx.Client:
+    """Connection pool shared by every OpenAI client in the process."""
+    return openai.DefaultHttpxClient(limits=_HTTP_LIMITS)
+
+
+@lru_cache(maxsize=8)
+def _get_openai_client(api_key: str, base_url: Optional[str]) -> openai.OpenAI:
+    """Shared client per endpoint, so services built per message reuse warm connections."""
+    return openai.OpenAI(api_key=api_key, base_url=base_url, http_client=_get_http_client())
+
+
+def close_http_clients() -> None:
+    """Close pooled connections to the LLM API; clients are rebuilt on next use."""
+    if _get_http_client.cache_info().currsize:
+        _get_http_client().close()
+    _get_openai_client.cache_clear()
+    _get_http_client.cache_clear()
+
+
+def _leading_system_contents(messages: List[Dict[str, Any]]) -> tuple:
+    """Text of the system messages the conversation starts with."""
+    prefix = []
+    for message in messages:
+        content = message.get("content")
+        if message.get("role") != "system" or not isinstance(content, str):
+            break
+        prefix.append(content)
+    return tuple(prefix)
+
+
+@lru_cache(maxsize=64)
+def _prompt_cache_key(system_contents: tuple) -> str:
+    """Stable identifier for a block of system prompts; the prompt strings are reused from config."""
+    return hashlib.sha256(json.dumps(system_contents).encode()).hexdigest()[:32]
+
+
+# User-facing messages for errors whose text names a known cause, in order of precedence
+_ERROR_MESSAGES = {
+    "rate_limit": "The AI service is currently busy. Please try again in a moment.",
+    "authentication": "There was an authentication issue with the AI service.",
+    "quota": "The AI service quota has been exceeded. Please contact support.",
+}
+_ERROR_KIND_RE = re.compile("|".join(_ERROR_MESSAGES), re.IGNORECASE)
+
+# Completions of temperature-0 requests by payload hash, least recently used first. Only exact
+# repeats hit, e.g. a retried message whose history and tool results have not changed.
+_RESPONSE_CACHE_TTL_SECONDS = 300
+_response_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+# Requests whose completion is being fetched, by the same payload hash; concurrent identical
+# requests wait on the first one's future instead of calling the API again
+_inflight_requests: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _cached_response(key: str) -> Optional[Dict[str, Any]]:
+    """Copy of a fresh cached completion, or None."""
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > _RESPONSE_CACHE_TTL_SECONDS:
+            del _response_cache[key]
+            return None
+        _response_cache.move_to_end(key)
+    return copy.deepcopy(entry[1])
+
+
+def _store_response(key: str, response: Dict[str, Any], max_entries: int) -> None:
+    """Cache a copy of a completion, evicting the least recently used beyond max_entries."""
+    entry = (time.monotonic(), copy.deepcopy(response))
+    with _response_cache_lock:
+        _response_cache[key] = entry
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > max_entries:
+            _response_cache.popitem(last=False)
+
+
 class LLMService:
     """LLM service for OpenAI ChatGPT integration."""
     
     def __init__(self, config: LLMConfig):
         self.config = config
-        self.client = openai.OpenAI(
-            api_key=config.api_key,
-            base_url=config.base_url
-        )
+        self.client = _get_openai_client(config.api_key, config.base_url)
+        # Request fields fixed by the (immutable) config; gpt-5 models take no temperature
+        if config.model.startswith("gpt-5"):
+            self._base_kwargs = {"model": config.model, "max_completion_tokens": config.max_tokens}
+        else:
+            self._base_kwargs = {"model": config.model, "max_tokens": config.max_tokens, "temperature": config.temperature}
     
     def chat_completion(
         self,
@@ -31,42 +144,108 @@ class LLMService:
     ) -> Dict[str, Any]:
         """Send chat completion request to LLM."""
         try:
-            kwargs = {
-                "model": self.config.model,
-                "messages": messages,
-                "stream": stream,
-            }
-
-            if self.config.model.startswith("gpt-5"):
-                kwargs["max_completion_tokens"] = self.config.max_tokens
-            else:
-                kwargs["max_tokens"] = self.config.max_tokens
-                kwargs["temperature"] = self.config.temperature
-            
-            if tools:
-                kwargs["tools"] = tools
-                if tool_choice:
-                    kwargs["tool_choice"] = tool_choice
+            kwargs = self._request_kwargs(messages, tools, tool_choice, stream)
             
             # Validate that all kwargs are JSON serializable
             self._validate_json_serializable(kwargs, "chat_completion kwargs")
             
-            if stream:
-                return self._handle_streaming_response(kwargs)
-            else:
-                return self._handle_non_streaming_response(kwargs)
+            cache_key = self._response_cache_key(kwargs)
+            if cache_key is None:
+                return self._request(kwargs)
+            
+            cached = _cached_response(cache_key)
+            if cached is not None:
+                logger.info("Serving chat completion from the response cache")
+                return cached
+            
+            # An identical request already in flight is waited on instead of sent again
+            with _inflight_lock:
+                pending = _inflight_requests.get(cache_key)
+                leader = pending is None
+                if leader:
+                    pending = _inflight_requests[cache_key] = Future()
+            if not leader:
+                logger.info("Joining an identical chat completion already in flight")
+                return copy.deepcopy(pending.result())
+            
+            try:
+                response = self._request(kwargs)
+                _store_response(cache_key, response, self.config.response_cache_size)
+                pending.set_result(copy.deepcopy(response))
+                return response
+            except BaseException as e:
+                pending.set_exception(e)
+                raise
+            finally:
+                with _inflight_lock:
+                    del _inflight_requests[cache_key]
                 
         except Exception as e:
-            logger.error(f"LLM request failed: {e}")
+            logger.error("LLM request failed: %s", e)
             raise
     
+    def _request_kwargs(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]],
+        tool_choice: Optional[str],
+        stream: bool
+    ) -> Dict[str, Any]:
+        """Completion request arguments on top of the config-derived fields."""
+        kwargs = self._base_kwargs.copy()
+        kwargs["messages"] = messages
+        kwargs["stream"] = stream
+        
+        if tools:
+            kwargs["tools"] = tools
+            if tool_choice:
+                kwargs["tool_choice"] = tool_choice
+        
+        # Route requests sharing the same system prompts to the same prompt cache. Only the
+        # OpenAI API knows this field; compatible servers behind base_url may reject it.
+        if self.config.base_url is None:
+            system_prefix = _leading_system_contents(messages)
+            if system_prefix:
+                kwargs["prompt_cache_key"] = _prompt_cache_key(system_prefix)
+        return kwargs
+    
+    def _request(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Send the request in the mode it asks for."""
+        if kwargs["stream"]:
+            return self._handle_streaming_response(kwargs)
+        return self._handle_non_streaming_response(kwargs)
+    
+    def _response_cache_key(self, kwargs: Dict[str, Any]) -> Optional[str]:
+        """Hash of a deterministic request, or None when its completion must not be reused."""
+        # gpt-5 models ignore temperature, so their output is never deterministic
+        if (
+            self.config.response_cache_size <= 0
+            or self.config.temperature != 0
+            or self.config.model.startswith("gpt-5")
+        ):
+            return None
+        
+        # Streamed and non-streamed completions are interchangeable once collected
+        payload = {key: value for key, value in kwargs.items() if key != "stream"}
+        # Completions are only shared between callers of the same endpoint and account
+        payload["base_url"] = self.config.base_url
+        payload["api_key"] = hashlib.sha256(self.config.api_key.encode()).hexdigest()
+        try:
+            return hashlib.sha256(_dumps(payload, sort_keys=True)).hexdigest()
+        except TypeError:
+            # Keys of mixed types can't be sorted into a stable form; just skip caching
+            return None
+    
     def _handle_non_streaming_response(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
         """Handle non-streaming response."""
         response = self.client.chat.completions.create(**kwargs)
+        choice = response.choices[0]
+        message = choice.message
+        usage = response.usage
         
         # Check if response was truncated due to length limits
-        if response.choices[0].finish_reason == 'length':
-            content = response.choices[0].message.content or ""
+        if choice.finish_reason == 'length':
+            content = message.content or ""
             # When finish_reason is 'length', the content is often empty or minimal
             if content.strip():
                 # If we have some content, try to end it gracefully
@@ -78,96 +257,106 @@ class LLMService:
                 # No content available - this is the common case with length truncation
                 content = "[Response was truncated due to length limits. The response was too long to fit within the token limit. Consider asking for a shorter response or breaking your question into smaller parts.]"
         else:
-            content = response.choices[0].message.content
+            content = message.content
         
         return {
             "content": content,
-            "tool_calls": response.choices[0].message.tool_calls,
-            "finish_reason": response.choices[0].finish_reason,
+            "tool_calls": message.tool_calls,
+            "finish_reason": choice.finish_reason,
             "usage": {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens
             }
         }
     
     def _handle_streaming_response(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
         """Handle streaming response to avoid truncation."""
+        try:
+            stream = self.client.chat.completions.create(**kwargs)
+            return self._consume_stream(stream)
+        except Exception as e:
+            logger.error("Streaming response failed: %s", e)
+            # Fallback to non-streaming
+            kwargs["stream"] = False
+            return self._handle_non_streaming_response(kwargs)
+    
+    def _consume_stream(self, stream, callback: Optional[callable] = None) -> Dict[str, Any]:
+        """Assemble streamed chunks into a completion, passing each content piece to callback if given."""
         collected_content = []
         tool_calls = []
+        argument_parts = []
         finish_reason = None
         usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
         
-        try:
-            stream = self.client.chat.completions.create(**kwargs)
-            
-            for chunk in stream:
-                if chunk.choices:
-                    choice = chunk.choices[0]
-                    
-                    # Collect content
-                    if hasattr(choice.delta, 'content') and choice.delta.content:
-                        collected_content.append(choice.delta.content)
-                    
-                    # Collect tool calls
-                    if hasattr(choice.delta, 'tool_calls') and choice.delta.tool_calls:
-                        for tool_call in choice.delta.tool_calls:
-                            if tool_call.index < len(tool_calls):
-                                # Continue existing tool call
-                                if tool_call.function:
-                                    if tool_call.function.name:
-                                        tool_calls[tool_call.index].function.name = tool_call.function.name
-                                    if tool_call.function.arguments:
-                                        tool_calls[tool_call.index].function.arguments += tool_call.function.arguments
-                            else:
-                                # Start new tool call - create a mock object to match non-streaming format
-                                mock_tool_call = type('ToolCall', (), {})()
-                                mock_tool_call.id = tool_call.id
-                                mock_tool_call.type = tool_call.type
-                                
-                                # Create function object
-                                mock_function = type('Function', (), {})()
-                                mock_function.name = tool_call.function.name or ""
-                                mock_function.arguments = tool_call.function.arguments or ""
-                                
-                                mock_tool_call.function = mock_function
-                                tool_calls.append(mock_tool_call)
-                    
-                    # Track finish reason
-                    if choice.finish_reason:
-                        finish_reason = choice.finish_reason
+        # The SDK's delta and chunk models always define these fields, None when absent
+        append_content = collected_content.append
+        for chunk in stream:
+            if chunk.choices:
+                choice = chunk.choices[0]
+                delta = choice.delta
                 
-                # Track usage if available
-                if hasattr(chunk, 'usage') and chunk.usage:
-                    usage = {
-                        "prompt_tokens": chunk.usage.prompt_tokens,
-                        "completion_tokens": chunk.usage.completion_tokens,
-                        "total_tokens": chunk.usage.total_tokens
-                    }
-            
-            content = "".join(collected_content)
-            
-            # Handle truncation in streaming
-            if finish_reason == 'length':
-                if content.strip():
-                    if not content.rstrip().endswith(('.', '!', '?', ':', ';')):
-                        content = content.rstrip() + "..."
-                    content += "\n\n[Response was truncated due to length limits. The response was too long to fit within the token limit.]"
-                else:
-                    content = "[Response was truncated due to length limits. The response was too long to fit within the token limit.]"
-
-            return {
-                "content": content,
-                "tool_calls": tool_calls if tool_calls else None,
-                "finish_reason": finish_reason,
-                "usage": usage
-            }
+                # Collect content
+                piece = delta.content
+                if piece:
+                    append_content(piece)
+                    if callback:
+                        callback(piece)
+                
+                # Collect tool calls
+                delta_tool_calls = delta.tool_calls
+                if delta_tool_calls:
+                    for tool_call in delta_tool_calls:
+                        if tool_call.index < len(tool_calls):
+                            # Continue existing tool call
+                            if tool_call.function:
+                                if tool_call.function.name:
+                                    tool_calls[tool_call.index]["function"]["name"] = tool_call.function.name
+                                if tool_call.function.arguments:
+                                    argument_parts[tool_call.index].append(tool_call.function.arguments)
+                        else:
+                            # Start new tool call, already in the shape extract_tool_calls returns
+                            tool_calls.append({
+                                "id": tool_call.id,
+                                "type": tool_call.type,
+                                "function": {"name": tool_call.function.name or "", "arguments": ""}
+                            })
+                            argument_parts.append([tool_call.function.arguments or ""])
+                
+                # Track finish reason
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
             
-        except Exception as e:
-            logger.error(f"Streaming response failed: {e}")
-            # Fallback to non-streaming
-            kwargs["stream"] = False
-            return self._handle_non_streaming_response(kwargs)
+            # Track usage if available
+            chunk_usage = chunk.usage
+            if chunk_usage:
+                usage = {
+                    "prompt_tokens": chunk_usage.prompt_tokens,
+                    "completion_tokens": chunk_usage.completion_tokens,
+                    "total_tokens": chunk_usage.total_tokens
+                }
+        
+        # Argument fragments are joined once at the end rather than concatenated per chunk
+        for tool_call, parts in zip(tool_calls, argument_parts):
+            tool_call["function"]["arguments"] = "".join(parts)
+        
+        content = "".join(collected_content)
+        
+        # Handle truncation in streaming
+        if finish_reason == 'length':
+            if content.strip():
+                if not content.rstrip().endswith(('.', '!', '?', ':', ';')):
+                    content = content.rstrip() + "..."
+                content += "\n\n[Response was truncated due to length limits. The response was too long to fit within the token limit.]"
+            else:
+                content = "[Response was truncated due to length limits. The response was too long to fit within the token limit.]"
+        
+        return {
+            "content": content,
+            "tool_calls": tool_calls if tool_calls else None,
+            "finish_reason": finish_reason,
+            "usage": usage
+        }
     
     def format_messages_with_context(
         self,
@@ -177,22 +366,11 @@ class LLMService:
         schema_prompts: Optional[List[str]] = None
     ) -> List[Dict[str, str]]:
         """Format messages with conversation context."""
-        messages = []
-        
-        # Add system prompts first
-        if system_prompts:
-            for system_prompt in system_prompts:
-                messages.append({"role": "system", "content": system_prompt})
-        
-        # Add schema prompts for API context
-        if schema_prompts:
-            for schema_prompt in schema_prompts:
-                messages.append({"role": "system", "content": schema_prompt})
-        
-        # Add conversation history
-        messages.extend(conversation_history)
-        
-        # Add current user message if provided and not empty
+        # System prompts first, then schema prompts for API context, the history,
+        # and the current user message if provided and not empty
+        messages = [{"role": "system", "content": prompt} for prompt in (system_prompts or ())]
+        messages += [{"role": "system", "content": prompt} for prompt in (schema_prompts or ())]
+        messages += conversation_history
         if user_message:
             messages.append({"role": "user", "content": user_message})
         
@@ -204,6 +382,10 @@ class LLMService:
         if not tool_calls:
             return []
         
+        # Streamed responses already carry normalized tool calls
+        if isinstance(tool_calls[0], dict):
+            return tool_calls
+        
         return [
             {
                 "id": tool_call.id,
@@ -230,16 +412,15 @@ class LLMService:
         """Continue a truncated response by asking the LLM to continue from where it left off."""
         try:
             # Create a continuation message
-            continuation_messages = messages.copy()
-            continuation_messages.append({
-                "role": "user", 
+            continuation_messages = [*messages, {
+                "role": "user",
                 "content": f"Please continue your previous response from where you left off. Your previous response was: '{truncated_content}'"
-            })
+            }]
             
             # Use streaming to avoid truncation in continuation
             return self.chat_completion(continuation_messages, tools, stream=use_streaming)
         except Exception as e:
-            logger.error(f"Failed to continue truncated response: {e}")
+            logger.error("Failed to continue truncated response: %s", e)
             raise
     
     def summarize_truncated_response(
@@ -252,16 +433,15 @@ class LLMService:
         """Create a summary of a truncated response to fit within token limits."""
         try:
             # Create a summarization request
-            summary_messages = messages.copy()
-            summary_messages.append({
-                "role": "user", 
+            summary_messages = [*messages, {
+                "role": "user",
                 "content": f"Please provide a concise summary of the following response that was truncated due to length limits: '{truncated_content}'. Focus on the key points and main conclusions."
-            })
+            }]
             
             # Use streaming to avoid truncation in summary
             return self.chat_completion(summary_messages, tools, stream=use_streaming)
         except Exception as e:
-            logger.error(f"Failed to summarize truncated response: {e}")
+            logger.error("Failed to summarize truncated response: %s", e)
             raise
     
     def get_truncated_response_metadata(self, response: Dict[str, Any]) -> Dict[str, Any]:
@@ -293,120 +473,33 @@ class LLMService:
     ) -> Dict[str, Any]:
         """Stream chat completion with optional callback for real-time updates."""
         try:
-            kwargs = {
-                "model": self.config.model,
-                "messages": messages,
-                "stream": True,
-            }
-
-            if self.config.model.startswith("gpt-5"):
-                kwargs["max_completion_tokens"] = self.config.max_tokens
-            else:
-                kwargs["max_tokens"] = self.config.max_tokens
-                kwargs["temperature"] = self.config.temperature
-            
-            if tools:
-                kwargs["tools"] = tools
-                if tool_choice:
-                    kwargs["tool_choice"] = tool_choice
+            kwargs = self._request_kwargs(messages, tools, tool_choice, True)
             
             # Validate that all kwargs are JSON serializable
             self._validate_json_serializable(kwargs, "stream_chat_completion kwargs")
             
-            collected_content = []
-            tool_calls = []
-            finish_reason = None
-            usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-            
             stream = self.client.chat.completions.create(**kwargs)
-            
-            for chunk in stream:
-                if chunk.choices:
-                    choice = chunk.choices[0]
-                    
-                    # Collect content
-                    if hasattr(choice.delta, 'content') and choice.delta.content:
-                        collected_content.append(choice.delta.content)
-                        
-                        # Call callback with incremental content if provided
-                        if callback:
-                            callback(choice.delta.content)
-                    
-                    # Collect tool calls
-                    if hasattr(choice.delta, 'tool_calls') and choice.delta.tool_calls:
-                        for tool_call in choice.delta.tool_calls:
-                            if tool_call.index < len(tool_calls):
-                                # Continue existing tool call
-                                if tool_call.function:
-                                    if tool_call.function.name:
-                                        tool_calls[tool_call.index].function.name = tool_call.function.name
-                                    if tool_call.function.arguments:
-                                        tool_calls[tool_call.index].function.arguments += tool_call.function.arguments
-                            else:
-                                # Start new tool call - create a mock object to match non-streaming format
-                                mock_tool_call = type('ToolCall', (), {})()
-                                mock_tool_call.id = tool_call.id
-                                mock_tool_call.type = tool_call.type
-                                
-                                # Create function object
-                                mock_function = type('Function', (), {})()
-                                mock_function.name = tool_call.function.name or ""
-                                mock_function.arguments = tool_call.function.arguments or ""
-                                
-                                mock_tool_call.function = mock_function
-                                tool_calls.append(mock_tool_call)
-                    
-                    # Track finish reason
-                    if choice.finish_reason:
-                        finish_reason = choice.finish_reason
-                
-                # Track usage if available
-                if hasattr(chunk, 'usage') and chunk.usage:
-                    usage = {
-                        "prompt_tokens": chunk.usage.prompt_tokens,
-                        "completion_tokens": chunk.usage.completion_tokens,
-                        "total_tokens": chunk.usage.total_tokens
-                    }
-            
-            content = "".join(collected_content)
-            
-            # Handle truncation in streaming
-            if finish_reason == 'length':
-                if content.strip():
-                    if not content.rstrip().endswith(('.', '!', '?', ':', ';')):
-                        content = content.rstrip() + "..."
-                    content += "\n\n[Response was truncated due to length limits. The response was too long to fit within the token limit.]"
-                else:
-                    content = "[Response was truncated due to length limits. The response was too long to fit within the token limit.]"
-            
-            return {
-                "content": content,
-                "tool_calls": tool_calls if tool_calls else None,
-                "finish_reason": finish_reason,
-                "usage": usage
-            }
+            return self._consume_stream(stream, callback)
             
         except Exception as e:
-            logger.error(f"Streaming chat completion failed: {e}")
+            logger.error("Streaming chat completion failed: %s", e)
             raise
     
     def _validate_json_serializable(self, data: Any, context: str = "") -> None:
         """Validate that data is JSON serializable to prevent OpenAI API errors."""
+        # The stdlib encoder, as the OpenAI SDK sends with; orjson would also accept UUIDs, enums and dataclasses
         try:
             json.dumps(data)
         except (TypeError, ValueError) as e:
-            logger.error(f"JSON serialization error in {context}: {e}")
-            logger.error(f"Problematic data: {data}")
+            logger.error("JSON serialization error in %s: %s", context, e)
+            logger.error("Problematic data: %s", data)
             raise ValueError(f"Data is not JSON serializable for OpenAI API: {e}")
 
     def get_error_message(self, error: Exception) -> str:
         """Get user-friendly error message for LLM errors."""
-        if "rate_limit" in str(error).lower():
-            return "The AI service is currently busy. Please try again in a moment."
-        elif "authentication" in str(error).lower():
-            return "There was an authentication issue with the AI service."
-        elif "quota" in str(error).lower():
-            return "The AI service quota has been exceeded. Please contact support."
-        else:
-            return "There was an issue communicating with the AI service. Please try again."
+        kinds = {match.lower() for match in _ERROR_KIND_RE.findall(str(error))}
+        for kind, message in _ERROR_MESSAGES.items():
+            if kind in kinds:
+                return message
+        return "There was an issue communicating with the AI service. Please try again."
 
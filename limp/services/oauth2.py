@@ -98,11 +98,12 @@ class OAuth2Service:
     
     def get_valid_token(self, user_id: int, system_name: str) -> Optional[AuthToken]:
         """Get valid OAuth2 token for user and system."""
-        # Get any token for this user/system (expired or not)
+        # Get any token for this user/system (expired or not). Sessions don't expire objects on commit,
+        # so reload the row in case another request refreshed it since this session first loaded it.
         token = self.db_session.query(AuthToken).filter(
             AuthToken.user_id == user_id,
             AuthToken.system_name == system_name
-        ).first()
+        ).populate_existing().first()
         
         if not token:
             return None
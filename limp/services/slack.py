@@ -2,51 +2,227 @@
 Slack integration service.
 """
 
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Mapping
+import hashlib
+import hmac
+import json
 import logging
+import os
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    # Faster JSON for message payloads carrying large block arrays and for parsing replies
+    import orjson
+except ImportError:
+    orjson = None
 
 from .im import IMService
 
 logger = logging.getLogger(__name__)
 
+# Requests signed longer ago than this are rejected as possible replays
+_SIGNATURE_MAX_AGE_SECONDS = 300
+
+# One session for every Slack Web API call, so consecutive calls reuse pooled connections to slack.com
+# instead of paying a TCP and TLS handshake each time
+_slack_http = requests.Session()
+_slack_http.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    # Retry only what Slack never processed: failed connects and 503 (service unavailable), with short
+    # jittered backoff. Read timeouts, 502 and 504 are not retried, since the edge may have answered after
+    # the message was already posted.
+    # Calls can run on the event loop, so Retry-After is never slept on here: a 429 goes straight
+    # back to the caller.
+    max_retries=Retry(
+        total=int(os.getenv("SLACK_HTTP_MAX_RETRIES", "3")),
+        read=0,
+        backoff_factor=0.2,
+        backoff_jitter=0.25,
+        status_forcelist=(503,),
+        allowed_methods=None,
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+))
+
+# Threads for fanning out independent Web API calls; well under the session's connection pool size
+_slack_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="slack-api")
+
+# Event IDs delivered recently, oldest first. Slack redelivers an event with the same event_id
+# when the first delivery was slow or failed, so repeats can be dropped before any work is done.
+_SEEN_EVENT_TTL_SECONDS = 600
+_SEEN_EVENTS_MAX = 50000
+_seen_events: "OrderedDict[str, float]" = OrderedDict()
+_seen_events_lock = threading.Lock()
+
+# DM channel per (bot token, user). conversations.open returns the same channel for as long as the user
+# stays in the workspace, so outbound DMs can skip that round trip.
+_DM_CHANNEL_TTL_SECONDS = 3600
+_DM_CHANNELS_MAX = 1024
+_dm_channels: "OrderedDict[tuple, tuple]" = OrderedDict()
+_dm_channels_lock = threading.Lock()
+
+# Errors meaning a cached channel can no longer be posted to
+_STALE_CHANNEL_ERRORS = frozenset(("channel_not_found", "is_archived", "user_not_found"))
+
+
+def _forget_dm_channel(channel: str) -> None:
+    """Drop cached DM entries pointing at a channel Slack no longer accepts."""
+    with _dm_channels_lock:
+        for key in [key for key, (channel_id, _) in _dm_channels.items() if channel_id == channel]:
+            del _dm_channels[key]
+
+
+def record_event_delivery(event_id: Optional[str]) -> bool:
+    """Remember a Slack event delivery; returns False if the event was already delivered recently."""
+    if not event_id:
+        return True
+    
+    now = time.monotonic()
+    with _seen_events_lock:
+        # Entries are in arrival order, so expired ones are always at the front
+        while _seen_events and (
+            len(_seen_events) >= _SEEN_EVENTS_MAX
+            or now - next(iter(_seen_events.values())) > _SEEN_EVENT_TTL_SECONDS
+        ):
+            _seen_events.popitem(last=False)
+        
+        if event_id in _seen_events:
+            return False
+        _seen_events[event_id] = now
+        return True
+
+
+def close_http_session() -> None:
+    """Close the pooled connections to slack.com; later calls reopen them as needed."""
+    _slack_http.close()
+
+
+@lru_cache(maxsize=8)
+def _signing_hmac(signing_secret: str) -> "hmac.HMAC":
+    """Keyed HMAC prototype for a signing secret; copies skip re-deriving the key pads per request."""
+    return hmac.new(signing_secret.encode(), digestmod=hashlib.sha256)
+
+
+def _encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Serialize a Web API request body to JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except orjson.JSONEncodeError:
+            # orjson is stricter in places (non-str keys, 64-bit integer range); let the stdlib decide
+            pass
+    return json.dumps(payload).encode()
+
+
+# Event types handled as user messages, and the stand-in for callbacks without an event
+_MESSAGE_EVENT_TYPES = frozenset(("message", "app_mention"))
+_EMPTY_EVENT: Mapping[str, Any] = MappingProxyType({})
+
+# Static hint shown under every authorization link; shared across calls and never mutated
+_AUTH_LINK_HINT_BLOCK: Dict[str, Any] = {
+    "type": "context",
+    "elements": [
+        {
+            "type": "mrkdwn",
+            "text": ":computer: Click the link above to open authorization in your browser"
+        }
+    ]
+}
+
+# Slack answers successful calls with compact JSON that starts with this prefix
+_OK_PREFIX = b'{"ok":true'
+_OK_RESULT: Mapping[str, Any] = MappingProxyType({"ok": True})
+
+
+def _decode_response(response: requests.Response) -> Dict[str, Any]:
+    """Parse a Web API response body straight from its bytes."""
+    if orjson is not None:
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            # Bodies orjson rejects (NaN literals, non-UTF-8 encodings) may still be valid to the stdlib
+            pass
+    return json.loads(response.content)
+
+
+def _read_status(response: requests.Response) -> Mapping[str, Any]:
+    """Result of a call whose only useful field is "ok"; skips JSON decoding on success."""
+    if response.content[:len(_OK_PREFIX)] == _OK_PREFIX:
+        return _OK_RESULT
+    return _decode_response(response)
+
 
 class SlackService(IMService):
     """Slack integration service."""
     
+    __slots__ = ("client_id", "client_secret", "signing_secret", "bot_token", "app_id", "_headers")
+    
     def __init__(self, client_id: str, client_secret: str, signing_secret: str, bot_token: Optional[str] = None, app_id: Optional[str] = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.signing_secret = signing_secret
         self.bot_token = bot_token
         self.app_id = app_id
+        # Built once; every Web API call sends the same headers
+        self._headers = {
+            "Authorization": f"Bearer {bot_token}",
+            "Content-Type": "application/json"
+        }
     
-    def verify_request(self, request_data: Dict[str, Any]) -> bool:
+    def verify_request(self, body: bytes, headers: Mapping[str, str]) -> bool:
         """Verify Slack request using signing secret."""
-        # Implementation would verify the request signature
-        # For now, return True as placeholder
-        return True
+        if not self.signing_secret:
+            logger.warning("No Slack signing secret configured, skipping request verification")
+            return True
+        
+        timestamp = headers.get("X-Slack-Request-Timestamp", "")
+        signature = headers.get("X-Slack-Signature", "")
+        try:
+            if abs(time.time() - int(timestamp)) > _SIGNATURE_MAX_AGE_SECONDS:
+                logger.warning(f"Rejecting Slack request with stale timestamp: {timestamp}")
+                return False
+        except ValueError:
+            logger.warning("Rejecting Slack request without a valid timestamp")
+            return False
+        
+        # Signature is HMAC-SHA256 over "v0:{timestamp}:{raw body}"; compare in constant time
+        mac = _signing_hmac(self.signing_secret).copy()
+        mac.update(b"v0:" + timestamp.encode() + b":")
+        mac.update(body)
+        expected = "v0=" + mac.hexdigest()
+        return hmac.compare_digest(expected.encode(), signature.encode())
     
     def parse_message(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Parse Slack message."""
-        if request_data.get("type") == "url_verification":
+        request_type = request_data.get("type")
+        if request_type == "url_verification":
             return {
                 "type": "challenge",
                 "challenge": request_data.get("challenge")
             }
         
-        if request_data.get("type") == "event_callback":
-            event = request_data.get("event", {})
+        if request_type == "event_callback":
+            event = request_data.get("event") or _EMPTY_EVENT
             
             # Ignore messages from our own bot to prevent infinite loops
             # Only ignore if event has app_id and it matches our app_id
             if self.app_id and event.get("app_id") == self.app_id:
-                logger.info(f"Ignoring message from own app_id: {self.app_id}")
+                logger.info("Ignoring message from own app_id: %s", self.app_id)
                 return {"type": "ignored"}
             
             # Handle both message and app_mention events
             # Skip messages from other bots (but not our own, which we already filtered above)
-            if event.get("type") in ["message", "app_mention"] and not event.get("bot_id"):
+            if event.get("type") in _MESSAGE_EVENT_TYPES and not event.get("bot_id"):
                 return {
                     "type": "message",
                     "user_id": event.get("user"),
@@ -71,52 +247,26 @@ class SlackService(IMService):
         
         return response
     
+    def _api_post(self, method: str, payload: Dict[str, Any]) -> requests.Response:
+        """POST one Web API call through the shared session."""
+        response = _slack_http.post(
+            f"https://slack.com/api/{method}",
+            headers=self._headers,
+            data=_encode_payload(payload),
+            timeout=10
+        )
+        if response.status_code == 429:
+            # The session doesn't retry rate limits, so this call is lost
+            logger.warning(f"Slack rate limited {method}, not retried (Retry-After: {response.headers.get('Retry-After')}s)")
+        return response
+    
     def send_message(self, channel: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
         """Send message to Slack channel."""
         if not self.bot_token:
             logger.error("No bot token available for Slack message")
             return False
         
-        try:
-            # Prepare the message payload
-            payload = {
-                "channel": channel,
-                "text": content
-            }
-            
-            # Add blocks if provided in metadata
-            if metadata and metadata.get("blocks"):
-                payload["blocks"] = metadata["blocks"]
-            
-            # Send the message using synchronous requests
-            try:
-                logger.debug(f"Sending message to Slack channel {channel}: {payload}")
-                response = requests.post(
-                    "https://slack.com/api/chat.postMessage",
-                    headers={
-                        "Authorization": f"Bearer {self.bot_token}",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload,
-                    timeout=10
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                if result.get("ok"):
-                    logger.info(f"Successfully sent message to Slack channel {channel}")
-                    return True
-                else:
-                    logger.error(f"Slack API error: {result.get('error')}")
-                    return False
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"HTTP error sending Slack message: {e}")
-                return False
-            
-        except Exception as e:
-            logger.error(f"Error sending Slack message: {e}")
-            return False
+        return self._post_chat(channel, content, metadata=metadata)
     
     def reply_to_message(self, channel: str, content: str, original_message_ts: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
         """Reply to a message in Slack - always use threads when possible."""
@@ -124,46 +274,47 @@ class SlackService(IMService):
             logger.error("No bot token available for Slack reply")
             return False
         
+        # Always use thread_ts to create a threaded reply, even for DMs
+        return self._post_chat(channel, content, thread_ts=original_message_ts, metadata=metadata)
+    
+    def _post_chat(self, channel: str, content: str, thread_ts: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Post a message, threaded under thread_ts when given; a rate-limited post is not retried and fails."""
+        kind = "reply" if thread_ts else "message"
+        payload = {
+            "channel": channel,
+            "text": content
+        }
+        if thread_ts:
+            payload["thread_ts"] = thread_ts
+        
+        # Add blocks if provided in metadata
+        if metadata and metadata.get("blocks"):
+            payload["blocks"] = metadata["blocks"]
+        
         try:
-            # Prepare the message payload
-            # Always use thread_ts to create a threaded reply, even for DMs
-            payload = {
-                "channel": channel,
-                "text": content,
-                "thread_ts": original_message_ts  # This creates a threaded reply
-            }
-            
-            # Add blocks if provided in metadata
-            if metadata and metadata.get("blocks"):
-                payload["blocks"] = metadata["blocks"]
+            logger.debug("Sending message to Slack channel %s: %s", channel, payload)
+            response = self._api_post("chat.postMessage", payload)
+            response.raise_for_status()
+            result = _read_status(response)
             
-            # Send the threaded reply using synchronous requests
-            try:
-                response = requests.post(
-                    "https://slack.com/api/chat.postMessage",
-                    headers={
-                        "Authorization": f"Bearer {self.bot_token}",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload,
-                    timeout=10
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                if result.get("ok"):
-                    logger.info(f"Successfully sent threaded reply to Slack message {original_message_ts}")
-                    return True
+            if result.get("ok"):
+                if thread_ts:
+                    logger.info(f"Successfully sent threaded reply to Slack message {thread_ts}")
                 else:
-                    logger.error(f"Slack API error: {result.get('error')}")
-                    return False
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"HTTP error sending Slack reply: {e}")
+                    logger.info(f"Successfully sent message to Slack channel {channel}")
+                return True
+            else:
+                logger.error(f"Slack API error: {result.get('error')}")
+                if result.get("error") in _STALE_CHANNEL_ERRORS:
+                    _forget_dm_channel(channel)
                 return False
-            
+                
+        except requests.exceptions.RequestException as e:
+            logger.error(f"HTTP error sending Slack {kind}: {e}")
+            return False
         except Exception as e:
-            logger.error(f"Error sending Slack reply: {e}")
+            # Includes blocks the JSON encoder rejects
+            logger.error(f"Error sending Slack {kind}: {e}")
             return False
     
     def create_authorization_button(self, auth_url: str, button_text: str, button_description: str, request=None) -> List[Dict[str, Any]]:
@@ -177,15 +328,7 @@ class SlackService(IMService):
                     "text": f"{button_description}\n\n:arrow_right: <{auth_url}|*{button_text}*>"
                 }
             },
-            {
-                "type": "context",
-                "elements": [
-                    {
-                        "type": "mrkdwn",
-                        "text": ":computer: Click the link above to open authorization in your browser"
-                    }
-                ]
-            }
+            _AUTH_LINK_HINT_BLOCK
         ]
     
     def get_user_dm_channel(self, user_id: str) -> str:
@@ -194,24 +337,29 @@ class SlackService(IMService):
             logger.error("No bot token available for getting user DM channel")
             return user_id  # Fallback to user_id if no token
         
+        cache_key = (self.bot_token, user_id)
+        with _dm_channels_lock:
+            cached = _dm_channels.get(cache_key)
+            if cached and time.monotonic() - cached[1] < _DM_CHANNEL_TTL_SECONDS:
+                _dm_channels.move_to_end(cache_key)
+                return cached[0]
+        
         try:
             # Use Slack's conversations.open API to get or create a DM channel
-            response = requests.post(
-                "https://slack.com/api/conversations.open",
-                headers={
-                    "Authorization": f"Bearer {self.bot_token}",
-                    "Content-Type": "application/json"
-                },
-                json={"users": user_id},
-                timeout=10
-            )
+            response = self._api_post("conversations.open", {"users": user_id})
             response.raise_for_status()
-            result = response.json()
+            result = _decode_response(response)
             
             if result.get("ok"):
                 channel_id = result.get("channel", {}).get("id")
                 if channel_id:
                     logger.info(f"Got DM channel {channel_id} for user {user_id}")
+                    # Only real channels are cached; the user_id fallbacks below are retried next time
+                    with _dm_channels_lock:
+                        _dm_channels[cache_key] = (channel_id, time.monotonic())
+                        _dm_channels.move_to_end(cache_key)
+                        if len(_dm_channels) > _DM_CHANNELS_MAX:
+                            _dm_channels.popitem(last=False)
                     return channel_id
                 else:
                     logger.error("No channel ID in Slack response")
@@ -234,21 +382,13 @@ class SlackService(IMService):
             return False
         
         try:
-            response = requests.post(
-                "https://slack.com/api/reactions.add",
-                headers={
-                    "Authorization": f"Bearer {self.bot_token}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "channel": channel,
-                    "timestamp": message_ts,
-                    "name": "thinking_face"  # Thinking emoji
-                },
-                timeout=10
-            )
+            response = self._api_post("reactions.add", {
+                "channel": channel,
+                "timestamp": message_ts,
+                "name": "thinking_face"  # Thinking emoji
+            })
             response.raise_for_status()
-            result = response.json()
+            result = _read_status(response)
             
             if result.get("ok"):
                 logger.info(f"Successfully added thinking reaction to Slack message {message_ts}")
@@ -283,17 +423,9 @@ class SlackService(IMService):
             if original_message_ts:
                 payload["thread_ts"] = original_message_ts
             
-            response = requests.post(
-                "https://slack.com/api/chat.postMessage",
-                headers={
-                    "Authorization": f"Bearer {self.bot_token}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=10
-            )
+            response = self._api_post("chat.postMessage", payload)
             response.raise_for_status()
-            result = response.json()
+            result = _decode_response(response)
             
             if result.get("ok"):
                 message_ts = result.get("ts")
@@ -316,36 +448,37 @@ class SlackService(IMService):
             logger.error("No bot token available for Slack message cleanup")
             return False
         
-        success_count = 0
-        for message_ts in message_ids:
-            try:
-                response = requests.post(
-                    "https://slack.com/api/chat.delete",
-                    headers={
-                        "Authorization": f"Bearer {self.bot_token}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "channel": channel,
-                        "ts": message_ts
-                    },
-                    timeout=10
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                if result.get("ok"):
-                    logger.info(f"Successfully deleted temporary Slack message {message_ts}")
-                    success_count += 1
-                else:
-                    logger.error(f"Slack API error deleting message {message_ts}: {result.get('error')}")
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"HTTP error deleting Slack message {message_ts}: {e}")
-            except Exception as e:
-                logger.error(f"Error deleting Slack message {message_ts}: {e}")
+        # Deletes are independent, so several go out at once instead of one round trip each
+        if len(message_ids) > 1:
+            results = list(_slack_executor.map(lambda message_ts: self._delete_message(channel, message_ts), message_ids))
+        else:
+            results = [self._delete_message(channel, message_ts) for message_ts in message_ids]
         
-        return success_count > 0
+        return any(results)
+    
+    def _delete_message(self, channel: str, message_ts: str) -> bool:
+        """Delete one message; failures are logged, not raised."""
+        try:
+            response = self._api_post("chat.delete", {
+                "channel": channel,
+                "ts": message_ts
+            })
+            response.raise_for_status()
+            result = _read_status(response)
+            
+            if result.get("ok"):
+                logger.info(f"Successfully deleted temporary Slack message {message_ts}")
+                return True
+            else:
+                logger.error(f"Slack API error deleting message {message_ts}: {result.get('error')}")
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            logger.error(f"HTTP error deleting Slack message {message_ts}: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Error deleting Slack message {message_ts}: {e}")
+            return False
     
     def complete_message(self, channel: str, message_ts: str, success: bool) -> bool:
         """Complete a message by removing thinking emoji and adding success/failure emoji."""
@@ -353,49 +486,20 @@ class SlackService(IMService):
             logger.error("No bot token available for Slack message completion")
             return False
         
+        # Removing the thinking_face emoji doesn't affect adding the result, so both go out at once
+        removal = _slack_executor.submit(self._remove_thinking_reaction, channel, message_ts)
         try:
-            # First, remove the thinking_face emoji
-            remove_response = requests.post(
-                "https://slack.com/api/reactions.remove",
-                headers={
-                    "Authorization": f"Bearer {self.bot_token}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "channel": channel,
-                    "timestamp": message_ts,
-                    "name": "thinking_face"
-                },
-                timeout=10
-            )
-            remove_response.raise_for_status()
-            remove_result = remove_response.json()
-            
-            # Log the removal attempt (don't fail if thinking emoji wasn't there)
-            if remove_result.get("ok"):
-                logger.info(f"Successfully removed thinking reaction from Slack message {message_ts}")
-            else:
-                logger.debug(f"Thinking reaction removal result: {remove_result.get('error', 'unknown')}")
-            
             # Add the appropriate completion emoji
             emoji_name = "white_check_mark" if success else "x"
             emoji_display = "green checkmark" if success else "red X"
             
-            add_response = requests.post(
-                "https://slack.com/api/reactions.add",
-                headers={
-                    "Authorization": f"Bearer {self.bot_token}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "channel": channel,
-                    "timestamp": message_ts,
-                    "name": emoji_name
-                },
-                timeout=10
-            )
+            add_response = self._api_post("reactions.add", {
+                "channel": channel,
+                "timestamp": message_ts,
+                "name": emoji_name
+            })
             add_response.raise_for_status()
-            add_result = add_response.json()
+            add_result = _read_status(add_response)
             
             if add_result.get("ok"):
                 logger.info(f"Successfully added {emoji_display} reaction to Slack message {message_ts}")
@@ -410,3 +514,24 @@ class SlackService(IMService):
         except Exception as e:
             logger.error(f"Error completing Slack message: {e}")
             return False
+        finally:
+            removal.result()
+    
+    def _remove_thinking_reaction(self, channel: str, message_ts: str) -> None:
+        """Remove the thinking_face emoji; a missing reaction or failed call is only logged."""
+        try:
+            remove_response = self._api_post("reactions.remove", {
+                "channel": channel,
+                "timestamp": message_ts,
+                "name": "thinking_face"
+            })
+            remove_response.raise_for_status()
+            remove_result = _read_status(remove_response)
+            
+            # Log the removal attempt (don't fail if thinking emoji wasn't there)
+            if remove_result.get("ok"):
+                logger.info(f"Successfully removed thinking reaction from Slack message {message_ts}")
+            else:
+                logger.debug(f"Thinking reaction removal result: {remove_result.get('error', 'unknown')}")
+        except Exception as e:
+            logger.error(f"Error removing thinking reaction from Slack message {message_ts}: {e}")
@@ -2,7 +2,7 @@
 Microsoft Teams integration service.
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Mapping
 import logging
 from botbuilder.schema import Activity, ActivityTypes
 from botbuilder.integration.aiohttp import CloudAdapter, ConfigurationBotFrameworkAuthentication
@@ -16,6 +16,15 @@ from .im import IMService
 
 logger = logging.getLogger(__name__)
 
+# Static prompt line of the authorization card; shared across calls and never mutated
+_AUTH_CARD_PROMPT_BLOCK: Dict[str, Any] = {
+    "type": "TextBlock",
+    "text": "Click the button below to authorize access:",
+    "wrap": True,
+    "size": "Small",
+    "color": "Accent"
+}
+
 
 class TeamsLIMPBot(ActivityHandler):
     """Teams bot that integrates with the shared message handling pipeline."""
@@ -73,8 +82,8 @@ class TeamsLIMPBot(ActivityHandler):
                 logger.error("No turn context available for sending response")
                 return False
             
-            logger.info(f"TeamsLIMPBot sending response: {content}")
-            logger.info(f"TeamsLIMPBot metadata: {metadata}")
+            logger.info("TeamsLIMPBot sending response: %s", content)
+            logger.info("TeamsLIMPBot metadata: %s", metadata)
             
             # Create activity with content and metadata
             activity = Activity(
@@ -96,7 +105,7 @@ class TeamsLIMPBot(ActivityHandler):
                         logger.info("TeamsLIMPBot detected Adaptive Card, sending as attachment")
                         activity.attachments = [first_block]
                         # Keep the main content as text
-                        logger.info(f"TeamsLIMPBot sending Adaptive Card with text: {content}")
+                        logger.info("TeamsLIMPBot sending Adaptive Card with text: %s", content)
                     else:
                         # This is plain text content - combine it
                         auth_content = first_block.get("content", "")
@@ -107,11 +116,11 @@ class TeamsLIMPBot(ActivityHandler):
             
             if metadata and metadata.get("attachments"):
                 activity.attachments = metadata["attachments"]
-                logger.info(f"TeamsLIMPBot attachments: {metadata['attachments']}")
+                logger.info("TeamsLIMPBot attachments: %s", metadata['attachments'])
             
             # Send using turn context (this is the working pattern)
             await self.current_turn_context.send_activity(activity)
-            logger.info(f"Successfully sent Teams response: {content}")
+            logger.info("Successfully sent Teams response: %s", content)
             return True
             
         except Exception as e:
@@ -133,6 +142,8 @@ class TeamsServiceConfig:
 class TeamsService(IMService):
     """Microsoft Teams integration service using Bot Framework ActivityHandler pattern."""
     
+    __slots__ = ("app_id", "client_id", "client_secret", "_config", "_adapter", "_conversation_references", "_current_bot")
+    
     def __init__(self, app_id: str, client_id: str, client_secret: str):
         self.app_id = app_id
         self.client_id = client_id
@@ -154,7 +165,7 @@ class TeamsService(IMService):
     async def on_error(context, error):
         logger.error(f"[on_turn_error] {type(error)}: {error}")
     
-    def verify_request(self, request_data: Dict[str, Any]) -> bool:
+    def verify_request(self, body: bytes, headers: Mapping[str, str]) -> bool:
         """Verify Teams request."""
         # Implementation would verify the request
         # For now, return True as placeholder
@@ -231,8 +242,8 @@ class TeamsService(IMService):
     async def send_message(self, channel: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
         """Send a message to Teams using the current bot's turn context."""
         try:
-            logger.info(f"TeamsService sending message to channel {channel}: {content}")
-            logger.info(f"TeamsService metadata: {metadata}")
+            logger.info("TeamsService sending message to channel %s: %s", channel, content)
+            logger.info("TeamsService metadata: %s", metadata)
             
             # Check if we have a current bot instance with turn context
             if hasattr(self, '_current_bot') and self._current_bot and self._current_bot.current_turn_context:
@@ -260,8 +271,8 @@ class TeamsService(IMService):
     def reply_to_message(self, channel: str, content: str, original_message_ts: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
         """Reply to a message in Teams."""
         try:
-            logger.info(f"Replying to Teams message {original_message_ts} in channel {channel}: {content}")
-            logger.info(f"Teams reply metadata: {metadata}")
+            logger.info("Replying to Teams message %s in channel %s: %s", original_message_ts, channel, content)
+            logger.info("Teams reply metadata: %s", metadata)
             
             # For Teams, since DMs don't support threads, we send a new message
             # This is still a "reply" conceptually, but implemented as a new message
@@ -271,7 +282,7 @@ class TeamsService(IMService):
                 # Use the bot's send_response method (uses turn_context.send_activity)
                 import asyncio
                 asyncio.create_task(self._current_bot.send_response(content, metadata))
-                logger.info(f"Successfully sent Teams reply: {content}")
+                logger.info("Successfully sent Teams reply: %s", content)
                 return True
             else:
                 logger.warning("No current bot turn context available for reply")
@@ -284,8 +295,8 @@ class TeamsService(IMService):
     
     def create_authorization_button(self, auth_url: str, button_text: str, button_description: str, request=None) -> List[Dict[str, Any]]:
         """Create authorization button blocks for Teams using Adaptive Cards."""
-        logger.info(f"Creating Teams authorization button: {button_text} -> {auth_url}")
-        logger.info(f"Button description: {button_description}")
+        logger.info("Creating Teams authorization button: %s -> %s", button_text, auth_url)
+        logger.info("Button description: %s", button_description)
         
         # Create an Adaptive Card with a proper button
         adaptive_card = {
@@ -300,13 +311,7 @@ class TeamsService(IMService):
                         "wrap": True,
                         "size": "Medium"
                     },
-                    {
-                        "type": "TextBlock",
-                        "text": "Click the button below to authorize access:",
-                        "wrap": True,
-                        "size": "Small",
-                        "color": "Accent"
-                    }
+                    _AUTH_CARD_PROMPT_BLOCK
                 ],
                 "actions": [
                     {
@@ -319,7 +324,7 @@ class TeamsService(IMService):
             }
         }
         
-        logger.info(f"Generated Teams Adaptive Card: {adaptive_card}")
+        logger.info("Generated Teams Adaptive Card: %s", adaptive_card)
         
         return [adaptive_card]
     
@@ -338,7 +343,7 @@ class TeamsService(IMService):
     
     def send_temporary_message(self, channel: str, content: str, original_message_ts: str = None) -> Optional[str]:
         """Send a temporary message (Teams stub - just logs)."""
-        logger.info(f"Teams temporary message requested for channel {channel}: {content}")
+        logger.info("Teams temporary message requested for channel %s: %s", channel, content)
         return f"teams_temp_{channel}_{hash(content)}"
     
     def cleanup_temporary_messages(self, channel: str, message_ids: List[str]) -> bool:
@@ -373,7 +378,7 @@ class TeamsService(IMService):
                     "service_url": activity.get("serviceUrl"),
                     "channel_id": activity.get("channelId")
                 }
-                logger.debug(f"Stored conversation reference for {conversation_id}: {self._conversation_references[conversation_id]}")
+                logger.debug("Stored conversation reference for %s: %s", conversation_id, self._conversation_references[conversation_id])
         except Exception as e:
             logger.error(f"Error storing conversation reference: {e}")
     
@@ -381,7 +386,7 @@ class TeamsService(IMService):
         """Send asynchronous response to Teams conversation."""
         try:
             if conversation_id in self._conversation_references:
-                logger.info(f"Sending async response to Teams conversation {conversation_id}: {content}")
+                logger.info("Sending async response to Teams conversation %s: %s", conversation_id, content)
                 # In a real implementation, you'd use the stored conversation reference
                 # to send the response via the Bot Framework
                 return True
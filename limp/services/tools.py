@@ -16,6 +16,7 @@ class ToolsService:
     
     def __init__(self):
         self.openapi_specs = {}  # Cache for loaded OpenAPI specs
+        self.tool_system_prompts = {}  # Cache for generated per-tool prompts, by spec URL
     
     def load_openapi_spec(self, spec_url: str) -> Dict[str, Any]:
         """Load OpenAPI specification from JSON or YAML format."""
@@ -629,6 +630,12 @@ class ToolsService:
         
         return prompts
     
+    def get_tool_system_prompts(self, spec_url: str) -> Dict[str, str]:
+        """Get cached per-tool system prompts for a spec, generating them on first use."""
+        if spec_url not in self.tool_system_prompts:
+            self.tool_system_prompts[spec_url] = self.generate_tool_system_prompts(self._get_or_load_spec(spec_url))
+        return self.tool_system_prompts[spec_url]
+    
     def generate_tool_system_prompts(self, openapi_spec: Dict[str, Any]) -> Dict[str, str]:
         """Generate per-tool system prompts for dynamic injection."""
         tool_prompts = {}
@@ -13,6 +13,8 @@ from limp.models.base import Base
 from limp.models.slack_organization import SlackOrganization  # Import to ensure table is created
 from limp.config import Config, DatabaseConfig, LLMConfig
 from limp.api.main import create_app
+from limp.services.llm import _get_openai_client, _response_cache
+from limp.services.slack import _dm_channels
 
 # Set fast test timeouts for all tests
 os.environ.setdefault("DATABASE_INIT_MAX_ATTEMPTS", "1")
@@ -21,6 +23,30 @@ os.environ.setdefault("DATABASE_CONNECTION_TIMEOUT", "5")
 os.environ.setdefault("DATABASE_POOL_TIMEOUT", "5")
 
 
+@pytest.fixture(autouse=True)
+def fresh_openai_clients():
+    """Keep clients built under a patched openai.OpenAI from leaking into other tests."""
+    _get_openai_client.cache_clear()
+    yield
+    _get_openai_client.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_llm_response_cache():
+    """Keep completions from mocked API calls from being served to other tests."""
+    _response_cache.clear()
+    yield
+    _response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_slack_dm_channels():
+    """Keep DM channels resolved against mocked Slack responses from leaking into other tests."""
+    _dm_channels.clear()
+    yield
+    _dm_channels.clear()
+
+
 @pytest.fixture
 def test_db_url():
     """Test database URL."""
@@ -8,7 +8,7 @@ from datetime import datetime, timedelta
 
 from limp.api.im import handle_user_message
 from limp.services.oauth2 import OAuth2Service
-from limp.services.slack import SlackService
+from limp.services.slack import SlackService, _encode_payload
 from limp.services.teams import TeamsService
 from limp.models.user import User
 from limp.models.auth import AuthToken
@@ -117,6 +117,41 @@ class TestAuthenticationFlow:
             "test_external_id"  # external_id
         )
     
+
+    @patch('limp.api.im.get_config')
+    @patch('limp.api.im.get_or_create_user')
+    @patch('limp.api.im.get_or_create_conversation')
+    @patch('limp.api.im.store_user_message')
+    @patch('limp.api.im.get_conversation_history')
+    @patch('limp.api.im.is_duplicate_message')
+    @patch('limp.api.im.generate_slack_message_id')
+    @pytest.mark.asyncio
+    async def test_handle_user_message_duplicate_on_insert_leaves_no_reaction(self, mock_generate_id, mock_is_duplicate, mock_get_conversation_history, mock_store_user_message, mock_get_or_create_conversation, mock_get_user, mock_get_config):
+        """Test that a duplicate caught by the insert is dropped before the message is acknowledged."""
+        # A concurrent delivery passes the early check but loses the insert
+        mock_is_duplicate.return_value = False
+        mock_generate_id.return_value = "test_external_id"
+        mock_store_user_message.return_value = None
+        
+        mock_config = Mock()
+        mock_config.get_primary_system.return_value = None
+        mock_get_config.return_value = mock_config
+        mock_get_user.return_value = self.mock_user
+        mock_get_or_create_conversation.return_value = Mock(id=1)
+        
+        result = await handle_user_message(
+            self.message_data,
+            self.mock_im_service,
+            self.mock_db_session,
+            "slack",
+            None
+        )
+        
+        assert result == {"status": "ok", "action": "duplicate_ignored"}
+        self.mock_im_service.acknowledge_message.assert_not_called()
+        self.mock_im_service.complete_message.assert_not_called()
+        mock_get_conversation_history.assert_not_called()
+
     @patch('limp.api.im.get_config')
     @patch('limp.api.im.get_or_create_user')
     @patch('limp.api.im.get_or_create_conversation')
@@ -340,6 +375,46 @@ class TestAuthenticationFlow:
         # Verify no reply to original message
         self.mock_im_service.reply_to_message.assert_not_called()
     
+    @patch('limp.api.im.get_config')
+    @patch('limp.api.im.get_or_create_user')
+    @patch('limp.api.im.OAuth2Service')
+    @patch('limp.api.im.is_duplicate_message')
+    @patch('limp.api.im.generate_slack_message_id')
+    @pytest.mark.asyncio
+    async def test_handle_user_message_no_token_sync_send(self, mock_generate_id, mock_is_duplicate, mock_oauth2_service, mock_get_user, mock_get_config):
+        """Test that the authorization prompt works with a synchronous send_message (Slack)."""
+        mock_is_duplicate.return_value = False
+        mock_generate_id.return_value = "test_external_id"
+        
+        mock_primary_system = Mock()
+        mock_primary_system.name = "test-system"
+        mock_config = Mock()
+        mock_config.get_primary_system.return_value = mock_primary_system
+        mock_config.bot.url = ""
+        mock_get_config.return_value = mock_config
+        mock_get_user.return_value = self.mock_user
+        
+        mock_oauth2_instance = Mock()
+        mock_oauth2_instance.get_valid_token.return_value = None
+        mock_oauth2_service.return_value = mock_oauth2_instance
+        
+        self.mock_im_service.get_user_dm_channel.return_value = "D123456"
+        self.mock_im_service.create_authorization_button.return_value = [{"type": "button"}]
+        self.mock_im_service.send_message = Mock(return_value=True)
+        
+        result = await handle_user_message(
+            self.message_data,
+            self.mock_im_service,
+            self.mock_db_session,
+            "slack",
+            None
+        )
+        
+        assert result["status"] == "ok"
+        assert result["action"] == "authorization_required"
+        self.mock_im_service.send_message.assert_called_once()
+        self.mock_im_service.complete_message.assert_called_once_with("C123456", "1234567890.123456", success=False)
+    
     @patch('limp.api.im.get_config')
     @patch('limp.api.im.get_or_create_user')
     @patch('limp.api.im.OAuth2Service')
@@ -611,7 +686,7 @@ class TestIMServiceAuthorizationButtons:
         assert actions[0]["url"] == auth_url
         assert actions[0]["style"] == "positive"
     
-    @patch('requests.post')
+    @patch('limp.services.slack._slack_http.post')
     def test_slack_get_user_dm_channel_success(self, mock_post):
         """Test successful Slack DM channel retrieval."""
         slack_service = SlackService(
@@ -623,10 +698,7 @@ class TestIMServiceAuthorizationButtons:
         
         # Mock successful API response
         mock_response = Mock()
-        mock_response.json.return_value = {
-            "ok": True,
-            "channel": {"id": "D123456"}
-        }
+        mock_response.content = b'{"ok":true,"channel":{"id":"D123456"}}'
         mock_response.raise_for_status.return_value = None
         mock_post.return_value = mock_response
         
@@ -639,11 +711,11 @@ class TestIMServiceAuthorizationButtons:
                 "Authorization": "Bearer test_bot_token",
                 "Content-Type": "application/json"
             },
-            json={"users": "U123456"},
+            data=_encode_payload({"users": "U123456"}),
             timeout=10
         )
     
-    @patch('requests.post')
+    @patch('limp.services.slack._slack_http.post')
     def test_slack_get_user_dm_channel_failure(self, mock_post):
         """Test Slack DM channel retrieval failure."""
         slack_service = SlackService(
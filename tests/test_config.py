@@ -55,6 +55,16 @@ def test_llm_config_with_max_iterations():
     assert config.max_iterations == 5
 
 
+def test_llm_config_is_frozen():
+    """Test LLM config is read-only and hashable."""
+    config = LLMConfig(api_key="test-key")
+
+    with pytest.raises(Exception):
+        config.model = "gpt-4o"
+
+    assert hash(config) == hash(LLMConfig(api_key="test-key"))
+
+
 def test_oauth2_config_creation():
     """Test OAuth2 config creation."""
     config = OAuth2Config(
@@ -303,6 +313,34 @@ def test_assign_primary_system():
         config.assign_primary_system("nonexistent")
 
 
+def test_get_im_platform_by_key():
+    """Test get_im_platform_by_key lookup."""
+    from limp.config import IMPlatformConfig
+
+    config = Config(
+        llm=LLMConfig(api_key="test-key"),
+        im_platforms=[
+            IMPlatformConfig(
+                platform="Slack",
+                app_id="test-app-id",
+                client_id="test-client-id",
+                client_secret="test-client-secret"
+            )
+        ]
+    )
+
+    assert config.get_im_platform_by_key("slack").platform == "Slack"
+    assert config.get_im_platform_by_key("SLACK").platform == "Slack"
+
+    # Known but unconfigured platform
+    with pytest.raises(ValueError, match="IM platform 'teams' not found"):
+        config.get_im_platform_by_key("teams")
+
+    # Unknown platform
+    with pytest.raises(ValueError, match="IM platform 'discord' not found"):
+        config.get_im_platform_by_key("discord")
+
+
 def test_load_config_primary_system_sanity_check():
     """Test sanity check for multiple primary systems during config load."""
     config_data = {
@@ -561,3 +599,12 @@ def test_load_config_with_empty_system_prompts():
     finally:
         Path(config_path).unlink()
 
+
+
+def test_mask_url_password():
+    """Test that URL passwords are masked for logging."""
+    from limp.config import mask_url_password
+    
+    assert mask_url_password("postgresql://limp:s3cret@db:5432/limp") == "postgresql://limp:***@db:5432/limp"
+    assert mask_url_password("postgresql://db:5432/limp") == "postgresql://db:5432/limp"
+    assert mask_url_password("sqlite:///./limp.db") == "sqlite:///./limp.db"
@@ -161,6 +161,19 @@ def test_substitute_config_values_dict():
         del os.environ['ENV_VAR']
 
 
+def test_substitute_config_values_with_env_snapshot():
+    """Test recursive variable substitution reads from the provided environment snapshot."""
+    config_data = {
+        "string_value": "Hello ${SNAPSHOT_VAR}",
+        "nested": ["${SNAPSHOT_VAR|fallback}", "${MISSING_VAR|fallback}"]
+    }
+
+    result = _substitute_config_values(config_data, None, {"SNAPSHOT_VAR": "snapshot"})
+
+    assert result["string_value"] == "Hello snapshot"
+    assert result["nested"] == ["snapshot", "fallback"]
+
+
 def test_substitute_config_values_list():
     """Test recursive variable substitution in lists."""
     config_data = [
@@ -817,9 +830,9 @@ def test_load_config_with_default_values():
         config_path = f.name
     
     try:
-        # Mock the environment variable lookup to ensure it returns None
+        # Clear the environment to ensure no variable lookup succeeds
         import unittest.mock
-        with unittest.mock.patch('os.getenv', return_value=None):
+        with unittest.mock.patch.dict(os.environ, {}, clear=True):
             config = load_config(config_path)
             
             # Should use default values since no environment variables are set
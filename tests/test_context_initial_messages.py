@@ -73,7 +73,7 @@ class TestContextInitialMessages:
             model="gpt-4"
         )
         
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             context_manager = ContextManager(config)
             
             # Mock the database query
@@ -157,7 +157,7 @@ class TestContextInitialMessages:
             model="gpt-4"
         )
         
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             context_manager = ContextManager(config)
             
             # Mock the database query
@@ -228,7 +228,7 @@ class TestContextInitialMessages:
             model="gpt-4"
         )
         
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             context_manager = ContextManager(config)
             
             # Test without summary
@@ -264,3 +264,34 @@ class TestContextInitialMessages:
         # The only difference should be the summary
         assert with_summary[3]["role"] == "system"
         assert "Previous conversation summary:" in with_summary[3]["content"]
+    
+    def test_reconstruct_history_reads_history_columns(self, test_session: Session):
+        """Test that reconstruction works from column rows queried straight from the database."""
+        user = User(external_id="U123", platform="slack")
+        test_session.add(user)
+        test_session.commit()
+        test_session.refresh(user)
+        
+        conversation = Conversation(user_id=user.id)
+        test_session.add(conversation)
+        test_session.commit()
+        test_session.refresh(conversation)
+        
+        for role, content in [("user", "Hello"), ("summary", "User said hello."), ("user", "Still there?")]:
+            test_session.add(Message(conversation_id=conversation.id, role=role, content=content, message_metadata={}))
+        test_session.commit()
+        conversation_id = conversation.id
+        test_session.expunge_all()
+        
+        config = LLMConfig(provider="openai", api_key="test-key", model="gpt-4")
+        with patch('limp.services.llm.openai.OpenAI'):
+            context_manager = ContextManager(config)
+            reconstructed = context_manager.reconstruct_history_with_summary(test_session, conversation_id)
+        
+        assert reconstructed == [
+            {"role": "user", "content": "Hello"},
+            {"role": "system", "content": "Previous conversation summary: User said hello."},
+            {"role": "user", "content": "Still there?"},
+        ]
+        # History rows are not loaded into the identity map
+        assert not any(isinstance(obj, Message) for obj in test_session.identity_map.values())
@@ -33,7 +33,7 @@ class TestContextManagementDemo:
     @pytest.fixture
     def context_manager(self, llm_config):
         """Create a context manager instance."""
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             return ContextManager(llm_config)
     
     def test_context_management_demo(self, context_manager):
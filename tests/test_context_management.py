@@ -6,12 +6,25 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 from sqlalchemy.orm import Session
 from datetime import datetime
+from collections import OrderedDict
 
 from limp.services.context import ContextManager
 from limp.models.conversation import Message, Conversation
 from limp.config import LLMConfig
 
 
+class WordEncoding:
+    """Offline stand-in for a BPE encoding that counts whitespace-separated words."""
+    name = "words"
+    
+    def __init__(self):
+        self.encoded = []
+    
+    def encode_ordinary(self, text):
+        self.encoded.append(text)
+        return text.split()
+
+
 class TestContextManager:
     """Test context management functionality."""
     
@@ -33,7 +46,7 @@ class TestContextManager:
     @pytest.fixture
     def context_manager(self, llm_config):
         """Create a context manager instance."""
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             return ContextManager(llm_config)
     
     def test_count_tokens_simple(self, context_manager):
@@ -74,6 +87,46 @@ class TestContextManager:
         assert tokens > 0
         assert isinstance(tokens, int)
     
+    def test_count_tokens_long_histories(self, context_manager, monkeypatch):
+        """Test that short and long histories count the same per message, parallel or not."""
+        encoding = WordEncoding()
+        context_manager._encoding = encoding
+        monkeypatch.setattr("limp.services.context._token_count_cache", OrderedDict())
+        message = {"role": "user", "content": "one two three"}
+        tool_message = {
+            "role": "assistant",
+            "content": "calling",
+            "tool_calls": [{"function": {"name": "get_weather", "arguments": "city paris"}}]
+        }
+        
+        # 3 words + 4 overhead; 1 + 1 + 2 words + 4 message + 4 tool call overhead
+        assert context_manager.count_tokens([message, tool_message]) == 7 + 12
+        
+        # Long histories are split across the encoder threads; counts come back in order
+        encoding.encoded.clear()
+        history = [{"role": "user", "content": "word " * (i % 7) + f"message {i}"} for i in range(200)]
+        assert context_manager.count_tokens(history) == sum(i % 7 + 2 + 4 for i in range(200))
+        assert sorted(encoding.encoded) == sorted(m["content"] for m in history)
+        
+        usage = context_manager.get_context_usage_percentage([message], system_prompts=["be brief"])
+        assert usage == pytest.approx((7 + 6) / 8192 * 100)
+    
+    def test_count_tokens_reuses_cached_counts(self, context_manager, monkeypatch):
+        """Test that only texts not seen before are encoded, across ContextManager instances."""
+        encoding = WordEncoding()
+        context_manager._encoding = encoding
+        monkeypatch.setattr("limp.services.context._token_count_cache", OrderedDict())
+        history = [{"role": "user", "content": f"message {i}"} for i in range(5)]
+        
+        assert context_manager.count_tokens(history) == 6 * 5
+        assert encoding.encoded == [f"message {i}" for i in range(5)]
+        
+        encoding.encoded.clear()
+        history.append({"role": "assistant", "content": "new reply"})
+        history.append({"role": "user", "content": "message 0"})
+        assert context_manager.count_tokens(history) == 6 * 7
+        assert encoding.encoded == ["new reply"]
+    
     def test_should_summarize_below_threshold(self, context_manager):
         """Test that summarization is not triggered below threshold."""
         messages = [
@@ -96,6 +149,21 @@ class TestContextManager:
         should_summarize = context_manager.should_summarize(messages)
         assert should_summarize
     
+    def test_should_summarize_skips_encoding_when_bytes_fit(self, context_manager, monkeypatch):
+        """Test that conversations whose byte size is under the threshold are never encoded."""
+        encoding = WordEncoding()
+        context_manager._encoding = encoding
+        monkeypatch.setattr("limp.services.context._token_count_cache", OrderedDict())
+        
+        assert not context_manager.should_summarize([{"role": "user", "content": "short message"}])
+        assert encoding.encoded == []
+        
+        # 7000 bytes exceed the 6144-token threshold bound, but 1000 words do not
+        assert not context_manager.should_summarize([{"role": "user", "content": "sixsix " * 1000}])
+        assert len(encoding.encoded) == 1
+        
+        assert context_manager.should_summarize([{"role": "user", "content": "a " * 7000}])
+    
     def test_summarize_conversation(self, context_manager):
         """Test conversation summarization."""
         # Mock the OpenAI response
@@ -132,6 +200,22 @@ class TestContextManager:
             summary = context_manager.summarize_conversation(messages, exclude_tool_calls=True)
             assert summary == "Summary without tool calls"
     
+    def test_summarize_conversation_keeps_static_prompt_prefix(self, context_manager):
+        """Test that instructions stay in the system message and only the conversation varies."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Summary"
+        
+        with patch.object(context_manager.client.chat.completions, 'create', return_value=mock_response) as mock_create:
+            context_manager.summarize_conversation([{"role": "user", "content": "Hello"}])
+            context_manager.summarize_conversation([{"role": "user", "content": "Something else"}])
+        
+        first, second = (call[1]['messages'] for call in mock_create.call_args_list)
+        assert first[0] == second[0]
+        assert "2048 tokens" in first[0]['content']
+        assert first[1] == {"role": "user", "content": "user: Hello\n"}
+        assert second[1] == {"role": "user", "content": "user: Something else\n"}
+    
     def test_create_summary_message(self, context_manager):
         """Test creation of summary message."""
         summary = "This is a test summary"
@@ -293,7 +377,7 @@ class TestContextManagementIntegration:
     @pytest.fixture
     def context_manager(self, llm_config):
         """Create a context manager instance."""
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             return ContextManager(llm_config)
     
     def test_full_context_management_flow(self, context_manager):
@@ -456,7 +540,7 @@ class TestContextManagerEdgeCases:
     @pytest.fixture
     def context_manager(self, llm_config):
         """Create a context manager instance."""
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             return ContextManager(llm_config)
     
     def test_empty_conversation(self, context_manager):
@@ -480,7 +564,7 @@ class TestContextManagerEdgeCases:
     def test_context_window_detection_fallback(self, context_manager):
         """Test fallback when context window detection fails."""
         # Test with unknown model
-        context_manager.config.model = "unknown-model"
+        context_manager.config = context_manager.config.model_copy(update={"model": "unknown-model"})
         context_manager._context_window_size = None
         
         window_size = context_manager._get_context_window_size()
@@ -489,7 +573,7 @@ class TestContextManagerEdgeCases:
     def test_unknown_model_fallback(self, context_manager):
         """Test fallback for unknown models."""
         # Change model to something unknown
-        context_manager.config.model = "unknown-model"
+        context_manager.config = context_manager.config.model_copy(update={"model": "unknown-model"})
         context_manager._context_window_size = None
         
         with patch('limp.services.context.tiktoken.encoding_for_model') as mock_encoding:
@@ -517,7 +601,7 @@ class TestContextManagerEdgeCases:
         
         for model_name, expected_size in test_cases:
             # Create a fresh context manager for each test
-            with patch('limp.services.context.openai.OpenAI'):
+            with patch('limp.services.llm.openai.OpenAI'):
                 # Create a fresh config for each test
                 fresh_config = LLMConfig(
                     provider="openai",
@@ -548,7 +632,7 @@ class TestContextManagerEdgeCases:
         
         for model_name, expected_size in test_cases:
             # Create a fresh context manager for each test
-            with patch('limp.services.context.openai.OpenAI'):
+            with patch('limp.services.llm.openai.OpenAI'):
                 # Create a fresh config for each test
                 fresh_config = LLMConfig(
                     provider="openai",
@@ -567,8 +651,50 @@ class TestContextManagerEdgeCases:
     
     def test_configured_context_window_override(self, context_manager):
         """Test that configured context window size overrides lookup."""
-        context_manager.config.context_window_size = 50000
+        context_manager.config = context_manager.config.model_copy(update={"context_window_size": 50000})
         context_manager._context_window_size = None
         
         size = context_manager._get_context_window_size()
         assert size == 50000
+
+
+def test_model_context_window_size_lookup():
+    """Test exact, pattern-matched and fallback context window lookups."""
+    from limp.services.context import _get_model_context_window_size
+    
+    assert _get_model_context_window_size("gpt-4o-mini") == 128000
+    assert _get_model_context_window_size("gpt-4-32k-custom") == 32768
+    assert _get_model_context_window_size("gpt-3.5-turbo-16k-0613") == 16384
+    assert _get_model_context_window_size("claude-3-opus") == 200000
+    assert _get_model_context_window_size("gpt-5-mini") == 200000
+    assert _get_model_context_window_size("GPT-4-Vision") == 128000
+    assert _get_model_context_window_size("gpt-4-0314") == 8192
+    assert _get_model_context_window_size("gpt-4o-custom") == 128000
+    assert _get_model_context_window_size("gpt-4-pro") == 8192
+    assert _get_model_context_window_size("my-gpt-4-model") == 8192
+    assert _get_model_context_window_size("llama-3") == 8192
+
+
+def test_warm_encoding_tolerates_load_failure():
+    """Test that a failed encoding preload is logged instead of raised."""
+    from limp.services.context import warm_encoding
+    
+    with patch('limp.services.context.tiktoken.encoding_for_model', side_effect=OSError("offline")) as mock_load:
+        warm_encoding("gpt-4")
+    
+    mock_load.assert_called_once_with("gpt-4")
+
+
+def test_context_managers_share_openai_client():
+    """Test that ContextManagers for the same endpoint reuse one OpenAI client."""
+    config = LLMConfig(api_key="test-key", model="gpt-4", base_url="https://llm.example.com/v1")
+    other_config = LLMConfig(api_key="other-key", model="gpt-4", base_url="https://llm.example.com/v1")
+    
+    with patch('limp.services.llm.openai.OpenAI', side_effect=lambda **kwargs: Mock()) as mock_openai:
+        first = ContextManager(config)
+        second = ContextManager(config)
+        other = ContextManager(other_config)
+    
+    assert first.client is second.client
+    assert other.client is not first.client
+    assert mock_openai.call_count == 2
@@ -22,7 +22,7 @@ class TestContextTemporaryMessages:
             context_window_size=8000  # Set a specific size for testing
         )
         
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             context_manager = ContextManager(config)
             
             # Test with empty messages
@@ -49,7 +49,7 @@ class TestContextTemporaryMessages:
             context_window_size=8000
         )
 
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             context_manager = ContextManager(config)
 
             messages = [{"role": "user", "content": "Hello"}]
@@ -67,7 +67,7 @@ class TestContextTemporaryMessages:
             model="gpt-4"
         )
         
-        with patch('limp.services.context.openai.OpenAI'):
+        with patch('limp.services.llm.openai.OpenAI'):
             context_manager = ContextManager(config)
             
             message = context_manager.create_summarization_message()
@@ -106,7 +106,7 @@ class TestContextTemporaryMessages:
 
             # Mock context manager
             mock_instance = Mock()
-            mock_instance.reconstruct_history_with_summary.return_value = [
+            mock_instance.reconstruct_history_with_summary_from_messages.return_value = [
                 {"role": "user", "content": "Hello"},
                 {"role": "assistant", "content": "Hi there!"}
             ]
@@ -2,10 +2,15 @@
 Tests for IM service functionality.
 """
 
+import hashlib
+import hmac
+import json
+import time
 import pytest
+import requests
 from unittest.mock import Mock, patch
 from limp.services.im import IMServiceFactory
-from limp.services.slack import SlackService
+from limp.services.slack import SlackService, _encode_payload
 from limp.services.teams import TeamsService
 
 
@@ -21,6 +26,46 @@ class TestSlackService:
             app_id="A09JTJR1R40"
         )
     
+    def _signed_headers(self, body, timestamp=None, secret="test_signing_secret"):
+        """Build Slack signature headers for a raw body."""
+        timestamp = str(int(time.time()) if timestamp is None else timestamp)
+        digest = hmac.new(secret.encode(), f"v0:{timestamp}:".encode() + body, hashlib.sha256).hexdigest()
+        return {"X-Slack-Request-Timestamp": timestamp, "X-Slack-Signature": f"v0={digest}"}
+    
+    def test_verify_request_valid_signature(self):
+        """Test that a correctly signed, fresh request is accepted."""
+        body = b'{"type": "event_callback"}'
+        other_body = b'{"type": "event_callback", "event_id": "Ev2"}'
+        
+        assert self.slack_service.verify_request(body, self._signed_headers(body)) is True
+        # The keyed HMAC is shared between requests; each verification must start from a clean copy
+        assert self.slack_service.verify_request(other_body, self._signed_headers(other_body)) is True
+    
+    def test_verify_request_rejects_tampered_body(self):
+        """Test that a signature over a different body or secret is rejected."""
+        body = b'{"type": "event_callback"}'
+        
+        assert self.slack_service.verify_request(b'{"type": "other"}', self._signed_headers(body)) is False
+        assert self.slack_service.verify_request(body, self._signed_headers(body, secret="wrong")) is False
+        assert self.slack_service.verify_request(body, {}) is False
+    
+    def test_verify_request_rejects_stale_timestamp(self):
+        """Test that replayed requests older than five minutes are rejected."""
+        body = b'{"type": "event_callback"}'
+        
+        headers = self._signed_headers(body, timestamp=int(time.time()) - 301)
+        assert self.slack_service.verify_request(body, headers) is False
+    
+    def test_verify_request_without_signing_secret(self):
+        """Test that verification is skipped when no signing secret is configured."""
+        slack_service = SlackService(
+            client_id="test_client_id",
+            client_secret="test_client_secret",
+            signing_secret=None
+        )
+        
+        assert slack_service.verify_request(b"{}", {}) is True
+    
     def test_parse_message_challenge(self):
         """Test parsing URL verification challenge."""
         challenge_data = {
@@ -33,6 +78,11 @@ class TestSlackService:
         assert result["type"] == "challenge"
         assert result["challenge"] == "test_challenge_123"
     
+    def test_parse_message_event_callback_without_event(self):
+        """Test that an event callback with a missing or null event parses as unknown."""
+        assert self.slack_service.parse_message({"type": "event_callback"}) == {"type": "unknown"}
+        assert self.slack_service.parse_message({"type": "event_callback", "event": None}) == {"type": "unknown"}
+    
     def test_parse_message_regular_message(self):
         """Test parsing regular message."""
         message_data = {
@@ -208,12 +258,12 @@ class TestSlackService:
         assert "blocks" in result
         assert result["blocks"] == metadata["blocks"]
     
-    @patch('requests.post')
+    @patch('limp.services.slack._slack_http.post')
     def test_send_message_success(self, mock_post):
         """Test sending message successfully."""
         # Mock successful API response
         mock_response = Mock()
-        mock_response.json.return_value = {"ok": True}
+        mock_response.content = b'{"ok":true,"channel":"C123456","ts":"1234567890.654321"}'
         mock_response.raise_for_status.return_value = None
         mock_post.return_value = mock_response
         
@@ -229,12 +279,161 @@ class TestSlackService:
         assert result is True
         mock_post.assert_called_once()
     
-    @patch('requests.post')
+    def test_shared_session_retries_only_unprocessed_requests(self):
+        """Test that the Slack session retries unavailability but never a timed-out read, gateway timeout or rate limit."""
+        from limp.services.slack import _slack_http
+        
+        retries = _slack_http.get_adapter("https://slack.com/api/chat.postMessage").max_retries
+        assert retries.read == 0
+        assert retries.is_retry("POST", 503)
+        assert not retries.is_retry("POST", 429)
+        assert not retries.is_retry("POST", 500)
+        assert not retries.is_retry("POST", 502)
+        assert not retries.is_retry("POST", 504)
+    
+    def test_shared_session_never_sleeps_for_retry_after(self):
+        """Test that a Retry-After header can't stall the calling thread."""
+        from limp.services.slack import _slack_http
+        
+        retries = _slack_http.get_adapter("https://slack.com/api/chat.postMessage").max_retries
+        
+        assert retries.respect_retry_after_header is False
+        with patch("urllib3.util.retry.time.sleep") as mock_sleep:
+            retries.sleep(Mock(headers={"Retry-After": "120"}))
+        assert all(call.args[0] < 5 for call in mock_sleep.call_args_list)
+    
+    @patch('limp.services.slack._slack_http.post')
+    def test_cleanup_temporary_messages_deletes_each_message(self, mock_post):
+        """Test that every temporary message is deleted and one failure does not fail the cleanup."""
+        def delete(url, headers, data, timeout):
+            response = Mock()
+            response.raise_for_status.return_value = None
+            response.content = b'{"ok":false,"error":"message_not_found"}' if json.loads(data)["ts"] == "2.0" else b'{"ok":true}'
+            return response
+        mock_post.side_effect = delete
+        
+        slack_service = SlackService(
+            client_id="test_client_id",
+            client_secret="test_client_secret",
+            signing_secret="test_signing_secret",
+            bot_token="test_bot_token"
+        )
+        
+        assert slack_service.cleanup_temporary_messages("C123456", ["1.0", "2.0", "3.0"]) is True
+        assert sorted(json.loads(call[1]["data"])["ts"] for call in mock_post.call_args_list) == ["1.0", "2.0", "3.0"]
+        assert slack_service.cleanup_temporary_messages("C123456", ["2.0"]) is False
+    
+    def test_read_status_skips_decoding_successful_responses(self):
+        """Test that compact success responses are recognised without JSON decoding."""
+        from limp.services.slack import _read_status
+        
+        success = Mock(content=b'{"ok":true,"channel":"C123456","message":{"text":"' + b"x" * 4096 + b'"}}')
+        with patch("limp.services.slack._decode_response") as decode:
+            assert _read_status(success) == {"ok": True}
+        decode.assert_not_called()
+        
+        failure = Mock(content=b'{"ok":false,"error":"channel_not_found"}')
+        assert _read_status(failure) == {"ok": False, "error": "channel_not_found"}
+    
+    @patch('limp.services.slack._slack_http.post')
+    def test_complete_message_swaps_reactions(self, mock_post):
+        """Test that completion removes the thinking reaction and adds the result, even if removal fails."""
+        def react(url, headers, data, timeout):
+            if url.endswith("reactions.remove"):
+                raise Exception("no_reaction")
+            response = Mock()
+            response.raise_for_status.return_value = None
+            response.content = b'{"ok":true}'
+            return response
+        mock_post.side_effect = react
+        
+        slack_service = SlackService(
+            client_id="test_client_id",
+            client_secret="test_client_secret",
+            signing_secret="test_signing_secret",
+            bot_token="test_bot_token"
+        )
+        
+        assert slack_service.complete_message("C123456", "1.0", success=True) is True
+        reactions = sorted((call[0][0].rsplit("/", 1)[1], json.loads(call[1]["data"])["name"]) for call in mock_post.call_args_list)
+        assert reactions == [("reactions.add", "white_check_mark"), ("reactions.remove", "thinking_face")]
+    
+    def test_encode_payload_without_orjson(self, monkeypatch):
+        """Test that payloads serialize the same with the stdlib fallback."""
+        from limp.services.slack import _encode_payload
+        payload = {"channel": "C123456", "text": "Héllo", "blocks": [{"type": "divider"}]}
+        
+        monkeypatch.setattr("limp.services.slack.orjson", None)
+        
+        assert json.loads(_encode_payload(payload)) == payload
+    
+    def test_json_falls_back_to_stdlib_where_orjson_is_stricter(self):
+        """Test that payloads and replies orjson rejects are still handled by the stdlib."""
+        from limp.services.slack import _decode_response
+        
+        assert json.loads(_encode_payload({"metadata": {1: "one"}})) == {"metadata": {"1": "one"}}
+        assert _decode_response(Mock(content=b'{"ok":true,"score":NaN}'))["ok"] is True
+    
+    @patch('limp.services.slack._slack_http.post')
+    def test_rate_limited_post_fails_and_is_logged(self, mock_post):
+        """Test that a rate-limited post fails without a retry and logs Slack's Retry-After."""
+        mock_post.return_value = requests.Response()
+        mock_post.return_value.status_code = 429
+        mock_post.return_value.headers["Retry-After"] = "30"
+        mock_post.return_value._content = b'{"ok":false,"error":"ratelimited"}'
+        
+        slack_service = SlackService(
+            client_id="test_client_id",
+            client_secret="test_client_secret",
+            signing_secret="test_signing_secret",
+            bot_token="test_bot_token"
+        )
+        
+        with patch('limp.services.slack.logger') as mock_logger:
+            assert slack_service.send_message("C123456", "Hello, world!") is False
+        
+        mock_post.assert_called_once()
+        warning = mock_logger.warning.call_args.args[0]
+        assert "chat.postMessage" in warning
+        assert "Retry-After: 30s" in warning
+    
+    def test_close_http_session_keeps_session_usable(self):
+        """Test that closing the shared session drops its pools without breaking later calls."""
+        from limp.services.slack import _slack_http, close_http_session
+        
+        adapter = _slack_http.get_adapter("https://slack.com/api/chat.postMessage")
+        with patch.object(adapter, "close", wraps=adapter.close) as mock_close:
+            close_http_session()
+        
+        mock_close.assert_called_once()
+        assert _slack_http.get_adapter("https://slack.com/api/chat.postMessage") is adapter
+    
+    @patch('limp.services.slack._slack_http.post')
+    def test_reply_to_message_reuses_shared_session(self, mock_post):
+        """Test that replies from separate service instances go through one pooled session."""
+        mock_response = Mock()
+        mock_response.content = b'{"ok":true,"channel":"C123456","ts":"1234567890.654321"}'
+        mock_response.raise_for_status.return_value = None
+        mock_post.return_value = mock_response
+        
+        for _ in range(2):
+            slack_service = SlackService(
+                client_id="test_client_id",
+                client_secret="test_client_secret",
+                signing_secret="test_signing_secret",
+                bot_token="test_bot_token"
+            )
+            assert slack_service.reply_to_message("C123456", "Hello!", "1234567890.123456") is True
+        
+        assert mock_post.call_count == 2
+        assert json.loads(mock_post.call_args[1]["data"])["thread_ts"] == "1234567890.123456"
+    
+    @patch('limp.services.slack._slack_http.post')
     def test_send_message_with_blocks(self, mock_post):
         """Test sending message with blocks."""
         # Mock successful API response
         mock_response = Mock()
-        mock_response.json.return_value = {"ok": True}
+        mock_response.content = b'{"ok":true,"channel":"C123456","ts":"1234567890.654321"}'
         mock_response.raise_for_status.return_value = None
         mock_post.return_value = mock_response
         
@@ -253,9 +452,11 @@ class TestSlackService:
         
         assert result is True
         call_args = mock_post.call_args
-        assert "blocks" in call_args[1]["json"]
+        posted = json.loads(call_args[1]["data"])
+        assert posted["blocks"] == metadata["blocks"]
+        assert "thread_ts" not in posted
     
-    @patch('requests.post')
+    @patch('limp.services.slack._slack_http.post')
     def test_send_message_no_token(self, mock_post):
         """Test sending message without bot token."""
         slack_service = SlackService(
@@ -294,18 +495,26 @@ class TestSlackService:
         assert context_block["type"] == "context"
         assert context_block["elements"][0]["type"] == "mrkdwn"
         assert context_block["elements"][0]["text"] == ":computer: Click the link above to open authorization in your browser"
-    
-    
-    
-    @patch('requests.post')
+
+    def test_create_authorization_button_reuses_static_block(self):
+        """Test that only the link section is rebuilt between authorization prompts."""
+        first = self.slack_service.create_authorization_button("https://a.example/auth", "Authorize A", "First", None)
+        second = self.slack_service.create_authorization_button("https://b.example/auth", "Authorize B", "Second", None)
+
+        assert first[1] is second[1]
+        assert first[0] is not second[0]
+        assert "https://a.example/auth" in first[0]["text"]["text"]
+        assert "https://b.example/auth" in second[0]["text"]["text"]
+        json.dumps(second)
+
+
+
+    @patch('limp.services.slack._slack_http.post')
     def test_get_user_dm_channel_success(self, mock_post):
         """Test successful DM channel retrieval."""
         # Mock successful API response
         mock_response = Mock()
-        mock_response.json.return_value = {
-            "ok": True,
-            "channel": {"id": "D123456"}
-        }
+        mock_response.content = b'{"ok":true,"channel":{"id":"D123456"}}'
         mock_response.raise_for_status.return_value = None
         mock_post.return_value = mock_response
         
@@ -325,11 +534,53 @@ class TestSlackService:
                 "Authorization": "Bearer test_bot_token",
                 "Content-Type": "application/json"
             },
-            json={"users": "U123456"},
+            data=_encode_payload({"users": "U123456"}),
             timeout=10
         )
     
-    @patch('requests.post')
+    @patch('limp.services.slack._slack_http.post')
+    def test_get_user_dm_channel_is_cached(self, mock_post):
+        """Test that a resolved DM channel is reused until Slack reports it gone."""
+        opened = Mock()
+        opened.raise_for_status.return_value = None
+        opened.content = b'{"ok":true,"channel":{"id":"D123456"}}'
+        not_found = Mock()
+        not_found.raise_for_status.return_value = None
+        not_found.content = b'{"ok":false,"error":"channel_not_found"}'
+        mock_post.side_effect = [opened, not_found, opened]
+        
+        slack_service = SlackService(
+            client_id="test_client_id",
+            client_secret="test_client_secret",
+            signing_secret="test_signing_secret",
+            bot_token="test_bot_token"
+        )
+        
+        assert slack_service.get_user_dm_channel("U123456") == "D123456"
+        assert slack_service.get_user_dm_channel("U123456") == "D123456"
+        assert mock_post.call_count == 1
+        
+        assert slack_service.send_message("D123456", "Hello") is False
+        assert slack_service.get_user_dm_channel("U123456") == "D123456"
+        assert mock_post.call_count == 3
+    
+    @patch('limp.services.slack._slack_http.post')
+    def test_get_user_dm_channel_does_not_cache_fallback(self, mock_post):
+        """Test that a failed lookup falls back to the user ID and is retried next time."""
+        mock_post.side_effect = Exception("API Error")
+        
+        slack_service = SlackService(
+            client_id="test_client_id",
+            client_secret="test_client_secret",
+            signing_secret="test_signing_secret",
+            bot_token="test_bot_token"
+        )
+        
+        assert slack_service.get_user_dm_channel("U123456") == "U123456"
+        assert slack_service.get_user_dm_channel("U123456") == "U123456"
+        assert mock_post.call_count == 2
+    
+    @patch('limp.services.slack._slack_http.post')
     def test_get_user_dm_channel_failure(self, mock_post):
         """Test DM channel retrieval failure."""
         # Mock API failure
@@ -476,6 +727,42 @@ class TestSlackService:
         assert result["text"] == "Hello from user without app_id!"
 
 
+class TestSlackEventDeduplication:
+    """Test short-circuiting of redelivered Slack events."""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_seen_events(self, monkeypatch):
+        """Start every test with no remembered deliveries."""
+        from collections import OrderedDict
+        monkeypatch.setattr("limp.services.slack._seen_events", OrderedDict())
+    
+    def test_redelivery_is_rejected(self):
+        """Test that only the first delivery of an event_id is accepted."""
+        from limp.services.slack import record_event_delivery
+        
+        assert record_event_delivery("Ev1") is True
+        assert record_event_delivery("Ev1") is False
+        assert record_event_delivery("Ev2") is True
+        assert record_event_delivery(None) is True
+        assert record_event_delivery(None) is True
+    
+    def test_event_ids_expire(self, monkeypatch):
+        """Test that an event_id is forgotten after the TTL and the set stays bounded."""
+        from limp.services import slack
+        
+        clock = [1000.0]
+        monkeypatch.setattr("limp.services.slack.time.monotonic", lambda: clock[0])
+        monkeypatch.setattr("limp.services.slack._SEEN_EVENTS_MAX", 3)
+        
+        assert slack.record_event_delivery("Ev1") is True
+        clock[0] += slack._SEEN_EVENT_TTL_SECONDS + 1
+        assert slack.record_event_delivery("Ev1") is True
+        
+        for event_id in ("Ev2", "Ev3", "Ev4"):
+            assert slack.record_event_delivery(event_id) is True
+        assert list(slack._seen_events) == ["Ev2", "Ev3", "Ev4"]
+
+
 class TestTeamsService:
     """Test Teams service functionality."""
     
@@ -644,6 +931,14 @@ class TestIMServiceFactory:
         assert service.client_id == "test_client_id"
         assert service.client_secret == "test_client_secret"
     
+    def test_services_have_no_instance_dict(self):
+        """Test that service instances keep their attributes in slots."""
+        slack_service = IMServiceFactory.create_service("slack", {"client_id": "id", "client_secret": "secret"})
+        teams_service = IMServiceFactory.create_service("teams", {"app_id": "app", "client_id": "id", "client_secret": "secret"})
+        
+        assert not hasattr(slack_service, "__dict__")
+        assert not hasattr(teams_service, "__dict__")
+    
     def test_create_unsupported_platform(self):
         """Test creating service for unsupported platform."""
         config = {
@@ -93,6 +93,39 @@ class TestIterativeWorkflow:
         assert result["content"] == "Hello, how can I help you?"
         self.llm_service.chat_completion.assert_called_once()
     
+    @pytest.mark.asyncio
+    @patch('limp.api.im.get_config')
+    async def test_llm_call_runs_off_event_loop(self, mock_get_config):
+        """Test that the blocking LLM round trip does not run on the event loop thread."""
+        import threading
+        mock_get_config.return_value = self.config
+        loop_thread = threading.current_thread()
+        call_threads = []
+        
+        def chat_completion(*args, **kwargs):
+            call_threads.append(threading.current_thread())
+            return {"content": "Hello", "tool_calls": None}
+        
+        self.llm_service.chat_completion.side_effect = chat_completion
+        self.llm_service.is_tool_call_response.return_value = False
+        
+        result = await process_llm_workflow(
+            "Hello",
+            [],
+            self.user,
+            self.oauth2_service,
+            self.llm_service,
+            self.tools_service,
+            self.db,
+            self.bot_url,
+            self.mock_im_service,
+            "test-channel",
+            "1234567890.123456"
+        )
+        
+        assert result["content"] == "Hello"
+        assert call_threads and call_threads[0] is not loop_thread
+    
     @pytest.mark.asyncio
     @patch('limp.services.context.ContextManager')
     @patch('limp.api.im.get_system_config')
@@ -15,6 +15,23 @@ from limp.services.tools import ToolsService
 from limp.config import LLMConfig
 
 
+def test_llm_services_share_client_and_pool():
+    """Test that services built per message reuse one client and connection pool per endpoint."""
+    from limp.services.llm import close_http_clients
+    
+    config = LLMConfig(api_key="test-key", model="gpt-4")
+    other_endpoint = LLMConfig(api_key="test-key", model="gpt-4", base_url="http://localhost:9999/v1")
+    
+    first = LLMService(config)
+    assert LLMService(config).client is first.client
+    assert LLMService(other_endpoint).client is not first.client
+    assert LLMService(other_endpoint).client._client is first.client._client
+    
+    close_http_clients()
+    assert first.client._client.is_closed
+    assert LLMService(config).client is not first.client
+
+
 def test_llm_service_initialization():
     """Test LLM service initialization."""
     config = LLMConfig(
@@ -68,6 +85,228 @@ def test_chat_completion_success(mock_openai):
     assert response["usage"]["total_tokens"] == 15
 
 
+def _completion_response(content):
+    """Non-streaming API response carrying the given content."""
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = content
+    response.choices[0].message.tool_calls = None
+    response.choices[0].finish_reason = "stop"
+    response.usage.prompt_tokens = 10
+    response.usage.completion_tokens = 5
+    response.usage.total_tokens = 15
+    return response
+
+
+@patch('limp.services.llm.openai.OpenAI')
+def test_chat_completion_reuses_deterministic_responses(mock_openai):
+    """Test that exact repeats of a temperature-0 request are served from the response cache."""
+    mock_client = Mock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [_completion_response("first"), _completion_response("second")]
+    
+    service = LLMService(LLMConfig(api_key="test-key", temperature=0))
+    messages = [{"role": "user", "content": "Hello"}]
+    
+    first = service.chat_completion(messages)
+    first["content"] = "changed by caller"
+    assert LLMService(LLMConfig(api_key="test-key", temperature=0)).chat_completion(messages)["content"] == "first"
+    assert mock_client.chat.completions.create.call_count == 1
+    
+    assert service.chat_completion([{"role": "user", "content": "Hello again"}])["content"] == "second"
+    assert mock_client.chat.completions.create.call_count == 2
+
+
+@patch('limp.services.llm.openai.OpenAI')
+def test_chat_completion_coalesces_identical_inflight_requests(mock_openai, monkeypatch):
+    """Test that a request identical to one still in flight waits for it instead of calling the API."""
+    import threading
+    import time
+    from limp.services import llm
+    
+    # Expire cached completions immediately, so only coalescing can save the second call
+    monkeypatch.setattr("limp.services.llm._RESPONSE_CACHE_TTL_SECONDS", -1)
+    follower_waiting = threading.Event()
+    log_info = llm.logger.info
+    
+    def info(message, *args, **kwargs):
+        if message.startswith("Joining"):
+            follower_waiting.set()
+        log_info(message, *args, **kwargs)
+    monkeypatch.setattr(llm.logger, "info", info)
+    
+    def create(**kwargs):
+        assert follower_waiting.wait(5)
+        return _completion_response("shared")
+    mock_client = Mock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = create
+    
+    service = LLMService(LLMConfig(api_key="test-key", temperature=0))
+    messages = [{"role": "user", "content": "Hello"}]
+    results = []
+    leader = threading.Thread(target=lambda: results.append(service.chat_completion(messages)))
+    leader.start()
+    while not llm._inflight_requests:
+        time.sleep(0.01)
+    results.append(service.chat_completion(messages))
+    leader.join(5)
+    
+    assert [result["content"] for result in results] == ["shared", "shared"]
+    assert results[0] is not results[1]
+    assert mock_client.chat.completions.create.call_count == 1
+    assert llm._inflight_requests == {}
+
+
+@pytest.mark.parametrize("other_config", [
+    {"api_key": "other-key"},
+    {"api_key": "test-key", "base_url": "https://proxy.example.com/v1"},
+])
+@patch('limp.services.llm.openai.OpenAI')
+def test_chat_completion_cache_is_scoped_to_endpoint_and_key(mock_openai, other_config):
+    """Test that a cached completion is not served to a service with another API key or base URL."""
+    mock_client = Mock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [_completion_response("first"), _completion_response("second")]
+    
+    messages = [{"role": "user", "content": "Hello"}]
+    first = LLMService(LLMConfig(api_key="test-key", temperature=0)).chat_completion(messages)
+    second = LLMService(LLMConfig(temperature=0, **other_config)).chat_completion(messages)
+    
+    assert first["content"] == "first"
+    assert second["content"] == "second"
+    assert mock_client.chat.completions.create.call_count == 2
+
+
+@pytest.mark.parametrize("config_overrides", [
+    {"temperature": 0.7},
+    {"temperature": 0, "model": "gpt-5-mini"},
+    {"temperature": 0, "response_cache_size": 0},
+])
+@patch('limp.services.llm.openai.OpenAI')
+def test_chat_completion_skips_cache_for_nondeterministic_requests(mock_openai, config_overrides):
+    """Test that sampled, gpt-5 and cache-disabled requests always reach the API."""
+    mock_client = Mock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [_completion_response("first"), _completion_response("second")]
+    
+    service = LLMService(LLMConfig(api_key="test-key", **config_overrides))
+    messages = [{"role": "user", "content": "Hello"}]
+    
+    assert service.chat_completion(messages)["content"] == "first"
+    assert service.chat_completion(messages)["content"] == "second"
+
+
+@pytest.mark.parametrize("model, expected_limits", [
+    ("gpt-4", {"max_tokens": 1000, "temperature": 0.7}),
+    ("gpt-5-mini", {"max_completion_tokens": 1000}),
+])
+@patch('limp.services.llm.openai.OpenAI')
+def test_chat_completion_token_limit_fields(mock_openai, model, expected_limits):
+    """Test that each model family gets its own token limit fields, unchanged across calls."""
+    mock_client = Mock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _completion_response("ok")
+    
+    service = LLMService(LLMConfig(api_key="test-key", model=model, max_tokens=1000, temperature=0.7))
+    service.chat_completion([{"role": "user", "content": "Hello"}])
+    service.chat_completion([{"role": "user", "content": "Again"}], tools=[{"type": "function", "function": {"name": "f"}}])
+    
+    first, second = (call.kwargs for call in mock_client.chat.completions.create.call_args_list)
+    assert first == {"model": model, "messages": [{"role": "user", "content": "Hello"}], "stream": False, **expected_limits}
+    assert "tools" in second and second["messages"][0]["content"] == "Again"
+
+
+def _stream_chunk(content=None, tool_calls=None, finish_reason=None, usage=None):
+    """Streaming chunk as parsed by the OpenAI SDK."""
+    from openai.types.chat import ChatCompletionChunk
+    choices = [] if usage else [{
+        "index": 0,
+        "delta": {"content": content, "tool_calls": tool_calls},
+        "finish_reason": finish_reason
+    }]
+    return ChatCompletionChunk.model_validate({
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-4",
+        "choices": choices,
+        "usage": usage
+    })
+
+
+@patch('limp.services.llm.openai.OpenAI')
+def test_streaming_chat_completion_collects_chunks(mock_openai):
+    """Test that streamed content, tool call fragments and usage are assembled from SDK chunks."""
+    mock_client = Mock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create.return_value = iter([
+        _stream_chunk(content="Looking "),
+        _stream_chunk(content="it up"),
+        _stream_chunk(tool_calls=[{"index": 0, "id": "call_1", "type": "function", "function": {"name": "search", "arguments": '{"q": '}}]),
+        _stream_chunk(tool_calls=[{"index": 0, "function": {"arguments": '"limp"}'}}]),
+        _stream_chunk(finish_reason="tool_calls"),
+        _stream_chunk(usage={"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}),
+    ])
+    
+    service = LLMService(LLMConfig(api_key="test-key"))
+    response = service.chat_completion([{"role": "user", "content": "Find limp"}], stream=True)
+    
+    assert response["content"] == "Looking it up"
+    assert response["finish_reason"] == "tool_calls"
+    assert response["usage"] == {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+    assert service.extract_tool_calls(response) == [
+        {"id": "call_1", "type": "function", "function": {"name": "search", "arguments": '{"q": "limp"}'}}
+    ]
+    # Streamed tool calls are built normalized, so extraction hands them back as they are
+    assert service.extract_tool_calls(response) is response["tool_calls"]
+
+
+@patch('limp.services.llm.openai.OpenAI')
+def test_stream_chat_completion_reports_pieces_to_callback(mock_openai):
+    """Test that stream_chat_completion shares chunk assembly and forwards each content piece."""
+    mock_client = Mock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create.return_value = iter([
+        _stream_chunk(content="Partial"),
+        _stream_chunk(content=" answer"),
+        _stream_chunk(finish_reason="length"),
+    ])
+    pieces = []
+    
+    service = LLMService(LLMConfig(api_key="test-key"))
+    response = service.stream_chat_completion([{"role": "user", "content": "Hi"}], callback=pieces.append)
+    
+    assert pieces == ["Partial", " answer"]
+    assert response["content"].startswith("Partial answer...\n\n[Response was truncated")
+    assert response["tool_calls"] is None
+    assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+
+
+@patch('limp.services.llm.openai.OpenAI')
+def test_chat_completion_prompt_cache_key_follows_system_prompts(mock_openai):
+    """Test that requests sharing system prompts share a prompt cache key, on the OpenAI API only."""
+    mock_client = Mock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _completion_response("ok")
+    
+    service = LLMService(LLMConfig(api_key="test-key"))
+    first = service.format_messages_with_context("Hello", [], ["You are LIMP."], ["Schema A"])
+    second = service.format_messages_with_context("Bye", [{"role": "assistant", "content": "Hi"}], ["You are LIMP."], ["Schema A"])
+    other = service.format_messages_with_context("Hello", [], ["You are LIMP."], ["Schema B"])
+    for messages in (first, second, other, [{"role": "user", "content": "No system prompt"}]):
+        service.chat_completion(messages)
+    
+    keys = [call.kwargs.get("prompt_cache_key") for call in mock_client.chat.completions.create.call_args_list]
+    assert keys[0] and keys[0] == keys[1]
+    assert keys[2] and keys[2] != keys[0]
+    assert keys[3] is None
+    
+    compatible = LLMService(LLMConfig(api_key="test-key", base_url="http://localhost:9999/v1"))
+    compatible.chat_completion(first)
+    assert "prompt_cache_key" not in mock_client.chat.completions.create.call_args.kwargs
+
+
 @patch('limp.services.llm.openai.OpenAI')
 def test_chat_completion_with_tools(mock_openai):
     """Test chat completion with tools."""
@@ -383,6 +622,10 @@ def test_get_error_message():
     generic_error = Exception("unknown_error")
     message = service.get_error_message(generic_error)
     assert "issue" in message.lower()
+    
+    # Matching is case-insensitive and rate limits win over other causes in the same text
+    assert "busy" in service.get_error_message(Exception("Quota check hit RATE_LIMIT")).lower()
+    assert "authentication" in service.get_error_message(Exception("Authentication required")).lower()
 
 
 # Tests for ToolsService
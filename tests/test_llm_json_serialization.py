@@ -102,6 +102,43 @@ class TestLLMJSONSerialization:
         with pytest.raises(ValueError, match="Data is not JSON serializable"):
             llm_service._validate_json_serializable({"key": datetime.now()}, "test")
     
+    def test_validate_json_serializable_accepts_what_the_stdlib_accepts(self):
+        """Test that validation doesn't reject data orjson can't encode but the OpenAI SDK can."""
+        config = LLMConfig(
+            api_key="test-key",
+            model="gpt-4",
+            base_url="https://api.openai.com/v1",
+            temperature=0
+        )
+        llm_service = LLMService(config)
+        
+        llm_service._validate_json_serializable({"metadata": {1: "one"}, "id": 2 ** 70}, "test")
+        assert llm_service._response_cache_key({"metadata": {1: "one", "two": 2}}) is None
+    
+    def test_validate_json_serializable_rejects_what_the_stdlib_rejects(self):
+        """Test that validation rejects values orjson can encode but the OpenAI SDK can't send."""
+        import dataclasses
+        import enum
+        import uuid
+        
+        class Color(enum.Enum):
+            RED = "red"
+        
+        @dataclasses.dataclass
+        class Point:
+            x: int
+        
+        config = LLMConfig(
+            api_key="test-key",
+            model="gpt-4",
+            base_url="https://api.openai.com/v1"
+        )
+        llm_service = LLMService(config)
+        
+        for value in (uuid.uuid4(), Color.RED, Point(1)):
+            with pytest.raises(ValueError, match="Data is not JSON serializable"):
+                llm_service._validate_json_serializable({"key": value}, "test")
+    
     def test_conversation_history_without_datetime(self):
         """Test that conversation history from context manager doesn't include datetime."""
         from limp.services.context import ContextManager
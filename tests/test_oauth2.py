@@ -175,6 +175,36 @@ def test_get_valid_token(test_session):
     assert token.access_token == "test_access_token"
 
 
+def test_get_valid_token_sees_refresh_from_another_session(test_engine):
+    """Test that a token already loaded in a non-expiring session is re-read after another session refreshes it."""
+    from sqlalchemy.orm import sessionmaker
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine, expire_on_commit=False)
+    session, other_session = SessionLocal(), SessionLocal()
+    try:
+        user = User(external_id="test_user_123", platform="slack")
+        session.add(user)
+        session.commit()
+        session.add(AuthToken(
+            user_id=user.id,
+            system_name="test_system",
+            access_token="old_access_token",
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        session.commit()
+        
+        oauth2_service = OAuth2Service(session)
+        token = oauth2_service.get_valid_token(user.id, "test_system")
+        assert token.access_token == "old_access_token"
+        
+        other_session.query(AuthToken).filter(AuthToken.user_id == user.id).one().access_token = "new_access_token"
+        other_session.commit()
+        
+        assert oauth2_service.get_valid_token(user.id, "test_system").access_token == "new_access_token"
+    finally:
+        other_session.close()
+        session.close()
+
+
 def test_get_valid_token_expired(test_session):
     """Test getting expired token without refresh token."""
     # Create user
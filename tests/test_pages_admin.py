@@ -76,8 +76,8 @@ def test_admin_revoke_token_authorized(test_client: TestClient):
         mock_db.delete.return_value = None
         mock_db.commit.return_value = None
         
-        with patch('limp.database.connection.sessionmaker') as mock_sessionmaker:
-            mock_sessionmaker.return_value.__enter__.return_value = mock_db
+        with patch('limp.database.connection._SessionLocal') as mock_session_local:
+            mock_session_local.return_value = mock_db
             
             response = test_client.delete(
                 "/admin/users/1/tokens/1",
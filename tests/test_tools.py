@@ -920,3 +920,26 @@ def test_execute_tool_call_path_parameter_missing():
         call_args = mock_get.call_args
         url = call_args[0][0]  # First positional argument
         assert "{organization_id}" in url  # Path parameter not substituted
+
+
+def test_get_tool_system_prompts_generates_once_per_spec():
+    """Per-tool system prompts are generated once per spec URL and then reused."""
+    service = ToolsService()
+    spec = {
+        "paths": {
+            "/users": {
+                "get": {
+                    "operationId": "getUsers",
+                    "description": "Get all users"
+                }
+            }
+        }
+    }
+    
+    with patch.object(service, '_get_or_load_spec', return_value=spec), \
+         patch.object(service, 'generate_tool_system_prompts', return_value={"getUsers": "prompt"}) as mock_generate:
+        first = service.get_tool_system_prompts("https://example.com/openapi.json")
+        second = service.get_tool_system_prompts("https://example.com/openapi.json")
+    
+    assert first == second == {"getUsers": "prompt"}
+    mock_generate.assert_called_once_with(spec)